@@ -1,5 +1,7 @@
 # app/api/__init__.py
 from .auth import router as auth_router
 from .product import router as product_router
+from .analytics import router as analytics_router
+from .events import router as events_router
 
-__all__ = ["auth_router","product_router"]
\ No newline at end of file
+__all__ = ["auth_router","product_router","analytics_router","events_router"]
\ No newline at end of file
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import get_async_read_db
+from app.core.dependencies import get_current_user
+from app.models.analytics import ActivityDemand, OrgDemand
+from app.models.user import User
+
+MAX_ANALYTICS_ROWS = 500
+
+router = APIRouter()
+
+def _serialize(row, key):
+    return {
+        key: getattr(row, key),
+        "cart_count": row.cart_count,
+        "total_quantity": row.total_quantity,
+        "pending_count": row.pending_count,
+        "replied_count": row.replied_count,
+        "updated_at": row.updated_at,
+    }
+
+@router.get("/activity-demand")
+async def get_activity_demand(
+    limit: int = Query(50, ge=1, le=MAX_ANALYTICS_ROWS, description="Top N activities by cart count"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Per-activity demand read from the activity_demand rollup, so the cost does not grow
+    with the number of cart submissions.
+    """
+    if current_user.role != "superuser":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    rows = (await db.execute(
+        select(ActivityDemand).order_by(ActivityDemand.cart_count.desc(), ActivityDemand.activity_uuid).limit(limit)
+    )).scalars().all()
+    return [dict(_serialize(row, "activity_uuid"), activity_name=row.activity_name) for row in rows]
+
+@router.get("/org-demand")
+async def get_org_demand(
+    limit: int = Query(50, ge=1, le=MAX_ANALYTICS_ROWS, description="Top N organisations by cart count"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Per-organisation demand from the org_demand rollup; users without an organisation
+    are grouped under an empty org_name.
+    """
+    if current_user.role != "superuser":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    rows = (await db.execute(
+        select(OrgDemand).order_by(OrgDemand.cart_count.desc(), OrgDemand.org_name).limit(limit)
+    )).scalars().all()
+    return [_serialize(row, "org_name") for row in rows]
@@ -1,25 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from app.schemas.auth import UserCreate, UserLogin, RoleUpgradeRequest, RefreshTokenRequest
-from app.core.auth_utils import create_access_token, get_password_hash, verify_password, create_refresh_token
-from app.core.db import get_db
-from app.models.user import User, RoleUpgradeRequestTable
-from app.core.dependencies import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+import re
+from datetime import datetime
+from typing import List
+from sqlalchemy import select, func, update, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, contains_eager
+from app.schemas.auth import UserCreate, UserLogin, RoleUpgradeRequest, RefreshTokenRequest, Principal, BulkRoleRequestDecision, RoleRequestOut
+from app.core.auth_utils import create_access_token, create_refresh_token
+from app.core.hash_pool import hash_password, check_password
+from app.core.db import get_db, get_async_db, get_read_db
+from app.models.user import User, RoleUpgradeRequestTable, phone_digits
+from app.core.dependencies import get_current_user, get_token_payload, invalidate_principal, record_role_change
+from app.core.sessions import open_session, rotate_session, revoke_sessions
+from app.models.session import UserSession
+from app.core.cache import LazyTTLCache
+from app.core.events import emit
+from app.core.versions import ROLE_REQUESTS, bump_version, version_query, conditional_response
 from jose import JWTError, jwt
 from app.core.config import settings
 
 router = APIRouter()
 
+MAX_BULK_ROLE_REQUESTS = 1000
+
+
+# Role-request totals for the admin badge; invalidated on every role-request mutation
+role_request_counts_cache = LazyTTLCache(lambda: 1, lambda: settings.role_request_counts_ttl)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _serialize_role_request(request: RoleUpgradeRequestTable) -> dict:
+    return {
+        "id": request.id,
+        "requested_role": request.requested_role,
+        "internal_role": request.internal_role,
+        "status": request.status,
+        "user_id": request.user_id,
+        "user": {
+            "username": request.user.username if request.user else "N/A",
+            "email": request.user.email if request.user else "N/A",
+            "name": request.user.name if request.user else "N/A",
+            "phone_number": request.user.phone_number if request.user else "N/A",
+        }
+    }
+
 
 @router.post("/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_user = db.query(User).filter(User.username == user.username).first()
+        db_user = (await db.execute(select(User).where(User.username == user.username))).scalars().first()
         if db_user:
             raise HTTPException(
                 status_code=400, detail="Username already registered")
 
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await hash_password(user.password)
         new_user = User(username=user.username, 
                         hashed_password=hashed_password, 
                         email=user.email, 
@@ -27,8 +64,8 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
                         name=user.name, 
                         org_name=user.org_name)
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         if user.role_request and user.role_request in ["organisation", "internal-staff"]:
             role_request = RoleUpgradeRequestTable(
@@ -37,28 +74,33 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
                 internal_role=user.internal_role if user.role_request == "internal-staff" else None
             )
             db.add(role_request)
-            db.commit()
+            await db.flush()
+            await emit(db, "role_request_created", role_request_id=role_request.id, requested_role=role_request.requested_role)
+            await db.execute(bump_version(db, ROLE_REQUESTS))
+            await db.commit()
+            role_request_counts_cache.clear()
 
-        return new_user
+        return Principal.model_validate(new_user)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error in Register API: {e}")
 
 
 @router.post("/login", status_code=status.HTTP_200_OK)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        db_user = db.query(User).filter(User.email == user.email).first()
-        if not db_user or not verify_password(user.password, db_user.hashed_password):
+        db_user = (await db.execute(select(User).where(User.email == user.email))).scalars().first()
+        if not db_user or not await check_password(user.password, db_user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
         
-        access_token = create_access_token({"sub": db_user.username, "role": db_user.role})
-        refresh_token = create_refresh_token({"sub": db_user.username})
-        
-        # Store the refresh token in the database
-        db_user.refresh_token = refresh_token
-        db.commit()
+        # One user_sessions row per device; the users row is no longer written on login
+        session, jti = await open_session(db, db_user.id, request.headers.get("user-agent"))
+        access_token = create_access_token({"sub": db_user.username, "role": db_user.role, "sid": session.id})
+        refresh_token = create_refresh_token({"sub": db_user.username, "sid": session.id, "jti": jti})
+        await db.commit()
         
         return {
             "access_token": access_token,
@@ -66,15 +108,19 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
             "role": db_user.role,
             "name": db_user.name
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in LoginAPI: {e}")
 
 
     
 @router.post("/refresh", status_code=status.HTTP_200_OK)
-def refresh_token(request_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+async def refresh_token(request_data: RefreshTokenRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Refresh the access token using a valid refresh token.
+    The refresh token is rotated: the one presented stops working, except that within
+    SESSION_REFRESH_GRACE seconds it returns the same new pair again.
     """
     try:
         # Decode the provided refresh token
@@ -95,32 +141,87 @@ def refresh_token(request_data: RefreshTokenRequest, db: Session = Depends(get_d
             detail="Invalid refresh token"
         )
 
-    db_user = db.query(User).filter(User.username == username).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="User not found")
+    session_id, jti = payload.get("sid"), payload.get("jti")
+    if session_id is None or not jti:
+        return await _refresh_legacy_token(request_data.refresh_token, username, request, db)
 
-    # Verify that the refresh token matches the one stored for the user.
-    if not db_user.refresh_token or db_user.refresh_token != request_data.refresh_token:
+    rotated = await rotate_session(db, session_id, jti)
+    await db.commit()
+    if not rotated:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, 
-            detail="Refresh token does not match"
+            detail="Refresh token is no longer valid"
         )
+    db_user, new_jti = rotated
 
-    # Generate new tokens
-    new_access_token = create_access_token({"sub": db_user.username, "role": db_user.role})
-    new_refresh_token = create_refresh_token({"sub": db_user.username})
-    
-    # Update the user with the new refresh token (token rotation)
-    db_user.refresh_token = new_refresh_token
-    db.commit()
+    return {
+        "access_token": create_access_token({"sub": db_user.username, "role": db_user.role, "sid": session_id}),
+        "refresh_token": create_refresh_token({"sub": db_user.username, "sid": session_id, "jti": new_jti}),
+        "role": db_user.role,
+        "name": db_user.name
+    }
 
+async def _refresh_legacy_token(token: str, username: str, request: Request, db: AsyncSession):
+    # Refresh tokens issued before user_sessions were matched against users.refresh_token;
+    # honour them once and move the client onto a session
+    db_user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if not db_user or not db_user.refresh_token or db_user.refresh_token != token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, 
+            detail="Refresh token does not match"
+        )
+    db_user.refresh_token = None
+    session, jti = await open_session(db, db_user.id, request.headers.get("user-agent"))
+    await db.commit()
     return {
-        "access_token": new_access_token,
-        "refresh_token": new_refresh_token,
+        "access_token": create_access_token({"sub": db_user.username, "role": db_user.role, "sid": session.id}),
+        "refresh_token": create_refresh_token({"sub": db_user.username, "sid": session.id, "jti": jti}),
         "role": db_user.role,
         "name": db_user.name
     }
-    
+
+@router.post("/logout")
+async def logout(
+    all_devices: bool = Query(False, description="End every session of this user, not just the current one"),
+    payload: dict = Depends(get_token_payload),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Revoke the current session (or all of them). Its refresh token stops working at once,
+    and its access tokens are rejected by every worker within a few seconds.
+    """
+    session_id = payload.get("sid")
+    if session_id is None and not all_devices:
+        return {"message": "Logged out", "revoked": 0}
+    revoked = await revoke_sessions(db, current_user.id, None if all_devices else session_id)
+    await db.commit()
+    return {"message": "Logged out", "revoked": revoked}
+
+@router.get("/sessions")
+async def list_sessions(
+    payload: dict = Depends(get_token_payload),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Active sessions (devices) of the current user.
+    """
+    rows = (await db.execute(
+        select(UserSession)
+        .where(UserSession.user_id == current_user.id, UserSession.revoked_at.is_(None), UserSession.expires_at > datetime.utcnow())
+        .order_by(UserSession.last_used_at.desc())
+    )).scalars().all()
+    return [
+        {
+            "id": row.id,
+            "device": row.device,
+            "created_at": row.created_at,
+            "last_used_at": row.last_used_at,
+            "current": row.id == payload.get("sid"),
+        }
+        for row in rows
+    ]
 
 @router.get("/get-role")
 async def get_user_role(current_user: User = Depends(get_current_user)):
@@ -150,8 +251,10 @@ def upgrade_user_role(username: str, role_request: RoleUpgradeRequest, db: Sessi
             )
 
         user_to_upgrade.role = role_request.role
+        record_role_change(db, [user_to_upgrade.username])
         db.commit()
         db.refresh(user_to_upgrade)
+        invalidate_principal(user_to_upgrade.username)
         
         return {"message": f"User {username} has been successfully upgraded to '{role_request.role}'."}
     
@@ -159,41 +262,135 @@ def upgrade_user_role(username: str, role_request: RoleUpgradeRequest, db: Sessi
         raise HTTPException(status_code=500, detail=f"Error upgrading user role: {e}")
     
 
-@router.get("/role-requests", dependencies=[Depends(get_current_user)])
+@router.get("/role-requests", response_model=List[RoleRequestOut], dependencies=[Depends(get_current_user)])
 def get_role_requests(
+    request: Request,
+    response: Response,
     status: str = Query("pending", enum=["pending", "approved", "rejected"]), 
-    db: Session = Depends(get_db), 
+    cursor: int = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(100, ge=1, le=500, description="Page size"),
+    db: Session = Depends(get_read_db), 
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "superuser":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    # Fetch role requests dynamically based on status
-    role_requests = (
+    # Pollers holding the current version get a 304 without the list query running
+    not_modified = conditional_response(request, response, ROLE_REQUESTS, db.execute(version_query(ROLE_REQUESTS)).first())
+    if not_modified:
+        return not_modified
+
+    # Fetch role requests dynamically based on status, oldest first,
+    # keyset-paginated on ix_role_upgrade_requests_status_id
+    query = (
         db.query(RoleUpgradeRequestTable)
         .options(joinedload(RoleUpgradeRequestTable.user))
         .filter(RoleUpgradeRequestTable.status == status)
-        .all()
     )
+    if cursor is not None:
+        query = query.filter(RoleUpgradeRequestTable.id > cursor)
+    role_requests = query.order_by(RoleUpgradeRequestTable.id).limit(limit + 1).all()
+
+    if len(role_requests) > limit:
+        role_requests = role_requests[:limit]
+        response.headers["X-Next-Cursor"] = str(role_requests[-1].id)
 
     # Build response safely with checks for null user
-    result = []
-    for request in role_requests:
-        if request.user:
-            result.append({
-                "id": request.id,
-                "requested_role": request.requested_role,
-                "internal_role": request.internal_role,
-                "status": request.status,
-                "user_id": request.user_id,
-                "user": {
-                    "username": request.user.username if request.user else "N/A",
-                    "email": request.user.email if request.user else "N/A",
-                    "name": request.user.name if request.user else "N/A",
-                    "phone_number": request.user.phone_number if request.user else "N/A",
-                }
-            })
-    return result
+    return [_serialize_role_request(request) for request in role_requests if request.user]
+
+
+@router.get("/role-requests/counts", dependencies=[Depends(get_current_user)])
+def get_role_request_counts(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Pending/approved/rejected totals for the admin badge, served from a short-lived
+    cached aggregate that role-request mutations invalidate. The aggregate is read
+    from the primary, not the replica, so replica lag doesn't add to the TTL: counts
+    are current in the worker that made a change and at most role_request_counts_ttl
+    seconds old in the others.
+    """
+    if current_user.role != "superuser":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    counts = role_request_counts_cache.get("counts")
+    if counts is None:
+        counts = {"pending": 0, "approved": 0, "rejected": 0}
+        rows = (
+            db.query(RoleUpgradeRequestTable.status, func.count(RoleUpgradeRequestTable.id))
+            .group_by(RoleUpgradeRequestTable.status)
+            .all()
+        )
+        for request_status, count in rows:
+            counts[request_status] = count
+        role_request_counts_cache.set("counts", counts)
+    return counts
+
+# Declared before /role-requests/{request_id} so "bulk" isn't parsed as a request id
+@router.put("/role-requests/bulk")
+def bulk_approve_or_reject_role_requests(
+    decision: BulkRoleRequestDecision, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+):
+    """
+    Approve or reject many role requests in one transaction using set-based UPDATEs.
+    Only pending requests are decided; the others are reported as already_decided.
+    """
+    if current_user.role != "superuser":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    request_ids = list(dict.fromkeys(decision.request_ids))
+    if len(request_ids) > MAX_BULK_ROLE_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ROLE_REQUESTS} role requests per call")
+    new_status = "approved" if decision.approve else "rejected"
+
+    try:
+        # Claim the pending requests first: a request decided concurrently is locked
+        # and re-checked here, so it can't also change the user's role below
+        decided = db.execute(
+            update(RoleUpgradeRequestTable)
+            .where(RoleUpgradeRequestTable.id.in_(request_ids), RoleUpgradeRequestTable.status == "pending")
+            .values(status=new_status)
+            .returning(RoleUpgradeRequestTable.id, RoleUpgradeRequestTable.user_id, RoleUpgradeRequestTable.requested_role)
+            .execution_options(synchronize_session=False)
+        ).all()
+        updated_ids = {row.id for row in decided}
+        usernames = []
+        if decision.approve and decided:
+            roles = {row.user_id: row.requested_role for row in decided}
+            usernames = db.execute(
+                update(User)
+                .where(User.id.in_(roles))
+                .values(role=case(roles, value=User.id))
+                .returning(User.username)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+        existing_ids = updated_ids
+        if len(updated_ids) < len(request_ids):
+            existing_ids = set(db.execute(
+                select(RoleUpgradeRequestTable.id).where(RoleUpgradeRequestTable.id.in_(request_ids))
+            ).scalars().all())
+        if updated_ids:
+            db.execute(bump_version(db, ROLE_REQUESTS))
+        record_role_change(db, usernames)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error updating role requests: {e}")
+
+    role_request_counts_cache.clear()
+    for username in usernames:
+        invalidate_principal(username)
+
+    def outcome(request_id):
+        if request_id in updated_ids:
+            return new_status
+        return "already_decided" if request_id in existing_ids else "not_found"
+
+    return {
+        "message": f"{len(updated_ids)} role request(s) {new_status}",
+        "results": [{"request_id": request_id, "status": outcome(request_id)} for request_id in request_ids]
+    }
 
 @router.put("/role-requests/{request_id}")
 def approve_or_reject_role_request(
@@ -210,17 +407,56 @@ def approve_or_reject_role_request(
     if approve:
         user.role = role_request.requested_role
         role_request.status = "approved"
+        record_role_change(db, [user.username])
     else:
         role_request.status = "rejected"
 
+    db.execute(bump_version(db, ROLE_REQUESTS))
     db.commit()
+    role_request_counts_cache.clear()
+    if approve:
+        invalidate_principal(user.username)
     return {"message": f"Role request {'approved' if approve else 'rejected'} successfully"}
 
 
-@router.get("/role-requests/search", dependencies=[Depends(get_current_user)])
+def role_request_search_query(db: Session, term: str, limit: int):
+    """
+    The search query behind /role-requests/search, for a non-empty stripped term.
+    Everything is a substring match served by the trigram indexes; phone numbers are
+    compared on their digits only, and matches at the start rank first.
+    """
+    pattern = _escape_like(term)
+    digits = re.sub(r"\D", "", term)
+
+    if digits and re.fullmatch(r"[\d\s\-()+.]+", term):
+        # "98765" finds "+91 98765 43210"; served by ix_users_phone_digits_trgm
+        phone = phone_digits(User.phone_number)
+        condition = phone.like(f"%{digits}%")
+        order = (case((phone.like(f"{digits}%"), 0), else_=1), func.length(phone))
+    elif "@" in term:
+        # Substring, so "@gmail.com" finds every Gmail address; served by ix_users_email_trgm
+        condition = User.email.ilike(f"%{pattern}%", escape="\\")
+        order = (case((func.lower(User.email).like(f"{pattern.lower()}%", escape="\\"), 0), else_=1), func.length(User.email))
+    else:
+        # Substring match, served by the trigram GIN indexes and ranked by similarity
+        condition = User.name.ilike(f"%{pattern}%", escape="\\") | User.email.ilike(f"%{pattern}%", escape="\\")
+        order = (func.greatest(func.similarity(User.name, term), func.similarity(User.email, term)).desc(),)
+
+    return (
+        db.query(RoleUpgradeRequestTable)
+        .join(User)
+        .options(contains_eager(RoleUpgradeRequestTable.user))
+        .filter(condition)
+        .order_by(*order, RoleUpgradeRequestTable.id.desc())
+        .limit(limit)
+    )
+
+
+@router.get("/role-requests/search", response_model=List[RoleRequestOut], dependencies=[Depends(get_current_user)])
 def search_role_requests(
     search: str = Query(..., title="Search Term", description="Search by name, email, or phone number"),
-    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -229,35 +465,10 @@ def search_role_requests(
     if current_user.role != "superuser":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    # Join User and RoleUpgradeRequestTable for search
-    query = (
-        db.query(RoleUpgradeRequestTable)
-        .join(User)
-        .options(joinedload(RoleUpgradeRequestTable.user))
-        .filter(
-            (User.name.ilike(f"%{search}%")) | 
-            (User.email.ilike(f"%{search}%")) |
-            (User.phone_number.ilike(f"%{search}%"))  # Filter by phone number
-        )
-    )
-
-    role_requests = query.all()
+    term = search.strip()
+    if not term:
+        return []
+    role_requests = role_request_search_query(db, term, limit).all()
 
     # Build response safely
-    result = []
-    for request in role_requests:
-        if request.user:
-            result.append({
-                "id": request.id,
-                "requested_role": request.requested_role,
-                "internal_role": request.internal_role,
-                "status": request.status,
-                "user_id": request.user_id,
-                "user": {
-                    "username": request.user.username if request.user else "N/A",
-                    "email": request.user.email if request.user else "N/A",
-                    "name": request.user.name if request.user else "N/A",
-                    "phone_number": request.user.phone_number if request.user else "N/A",
-                }
-            })
-    return result
\ No newline at end of file
+    return [_serialize_role_request(request) for request in role_requests if request.user]
@@ -0,0 +1,67 @@
+import asyncio
+import json
+from datetime import timedelta
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth_utils import create_access_token
+from app.core.config import settings
+from app.core.db import get_async_db
+from app.core.dependencies import get_current_user, get_token_payload, get_stream_token_payload
+from app.core.events import broker, is_closed
+from app.models.user import User
+
+router = APIRouter()
+
+async def _event_stream(queue: asyncio.Queue):
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.events_keepalive_interval)
+            except asyncio.TimeoutError:
+                # Comment line, keeps proxies from timing out an idle stream
+                yield ": keepalive\n\n"
+                continue
+            if is_closed(event):
+                break
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        broker.unsubscribe(queue)
+
+@router.post("/stream-token")
+async def create_stream_token(payload: dict = Depends(get_token_payload), current_user: User = Depends(get_current_user)):
+    """
+    Short-lived token for opening the event stream from a browser, whose EventSource
+    can't send an Authorization header: new EventSource(`/api/events/stream?token=${token}`).
+    It only works on the stream, and only until it expires; fetch a fresh one before
+    every (re)connect.
+    """
+    if current_user.role != "superuser":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    token = create_access_token(
+        {"sub": current_user.username, "sid": payload.get("sid"), "scope": "events"},
+        timedelta(seconds=settings.events_token_ttl),
+    )
+    return {"token": token, "expires_in": settings.events_token_ttl}
+
+@router.get("/stream")
+async def stream_events(payload: dict = Depends(get_stream_token_payload), db: AsyncSession = Depends(get_async_db)):
+    """
+    Server-sent events for the admin UI: cart_submitted, cart_replied and
+    role_request_created. Events carry ids only; clients refetch what they show.
+    A client that falls too far behind is disconnected and should reconnect and refetch.
+    Authenticates with a Bearer header or with ?token= from POST /stream-token.
+    """
+    current_user = await get_current_user(payload, db)
+    if current_user.role != "superuser":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if broker.client_count >= settings.events_max_clients:
+        raise HTTPException(status_code=503, detail="Too many event stream clients", headers={"Retry-After": "5"})
+
+    queue = broker.subscribe()
+    return StreamingResponse(
+        _event_stream(queue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,92 +1,190 @@
 import random
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query, Header
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+from uuid import UUID
 from app.models.user import User
 from app.core.dependencies import get_current_user
-from app.schemas.cart import CartItem
-from app.models.cart import CartSubmission
-from sqlalchemy.orm import Session
-from app.core.db import get_db
-from app.core.emailer import send_email
+from app.schemas.cart import CartItem, CartSubmissionPage
+from app.models.cart import CartSubmission, CartLineItem, StatusEnum
+from sqlalchemy import select, insert, update, exists, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import get_async_db, get_async_read_db, AsyncReadSessionLocal
+from app.core.emailer import enqueue_email
+from app.core.analytics import record_submission, record_reply
+from app.core.idempotency import REPLAY_HEADER, request_fingerprint, find_replay, claim_key
+from app.core.events import emit
+from app.core.versions import CART_SUBMISSIONS, bump_version, version_query, conditional_response
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.pricing import get_cart_price, price_many, PricingUnavailable, UnknownActivity
 from pydantic import BaseModel
+import csv
+import io
 import json
-import requests
 from app.core.config import settings
 
-PRICING_WEBHOOK_URL = settings.pricing_webhook_url
+MAX_PAGE_SIZE = 200
 
 router = APIRouter()
 
 class QuotePriceRequest(BaseModel):
     quoted_price: float
 
+class BulkPriceRequest(BaseModel):
+    cart_submission_ids: Optional[List[int]] = None
+    status: Optional[StatusEnum] = None
+    direct_factor: float
+    indirect_factor: float
+
+def _contains_activity(activity_uuid: UUID):
+    # Served by ix_cart_items_activity_uuid_submission_id
+    return exists().where(CartLineItem.submission_id == CartSubmission.id, CartLineItem.activity_uuid == str(activity_uuid))
+
 @router.post("/submit-cart")
-async def submit_cart(cart_items: List[CartItem], request: Request, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def submit_cart(
+    cart_items: List[CartItem],
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Retries with the same key replay the first response"),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    serialized_cart_items = [{
+        "uuid": str(item.uuid),
+        "activity_name": item.activity_name,
+        "quantity": item.quantity
+    } for item in cart_items]
+
+    key, ttl = idempotency_key, settings.idempotency_key_ttl
+    fingerprint = request_fingerprint(sorted(serialized_cart_items, key=lambda item: (item["uuid"], item["quantity"])))
+    if not key and settings.cart_dedup_window:
+        key, ttl = f"cart-content:{fingerprint}", settings.cart_dedup_window
+
     try:
-        serialized_cart_items = [{
-            "uuid": str(item.uuid),
-            "activity_name": item.activity_name,
-            "quantity": item.quantity
-        } for item in cart_items]
-        
+        claim = None
+        if key:
+            replay = await find_replay(db, user.id, key, fingerprint)
+            if replay is not None:
+                response.headers[REPLAY_HEADER] = "true"
+                return replay
+            claim = await claim_key(db, user.id, key, fingerprint, ttl)
+
         cart_submission = CartSubmission(user_id=user.id, status="pending", cart_items=serialized_cart_items)
         db.add(cart_submission)
-        db.commit()
-        db.refresh(cart_submission)
-        
+        await db.flush()
+        # Normalized copy of the lines in one executemany
+        if serialized_cart_items:
+            await db.execute(insert(CartLineItem), [
+                {"submission_id": cart_submission.id, "activity_uuid": item["uuid"],
+                 "activity_name": item["activity_name"], "quantity": item["quantity"]}
+                for item in serialized_cart_items
+            ])
+
         subject = "Cart Submission Confirmation - Jigyasu"
         content = f"Hello {user.name},\n\nYour cart has been successfully submitted. We are processing it now.\n\nThank you!"
-        send_email(user.email, subject, content)
+        enqueue_email(db, user.email, subject, content)
 
-        return {"message": "Cart submitted successfully", "items_received": len(cart_items), "status": cart_submission.status}
-    
+        result = {"message": "Cart submitted successfully", "items_received": len(cart_items), "status": cart_submission.status}
+        if claim is not None:
+            claim.response = result
+        await emit(db, "cart_submitted", cart_submission_id=cart_submission.id, user_id=user.id, items=len(cart_items))
+        # The demand rollups (org_demand's "" row in particular) and the version counter are
+        # rows every submission updates, so they are written last to hold their locks briefly
+        await record_submission(db, user.org_name, serialized_cart_items)
+        await db.execute(bump_version(db, CART_SUBMISSIONS))
+        await db.commit()
+
+        return result
+
+    except IntegrityError as e:
+        await db.rollback()
+        # A concurrent retry with the same key committed first
+        replay = await find_replay(db, user.id, key, fingerprint) if key else None
+        if replay is None:
+            print(f"Error processing the cart: {e}")
+            raise HTTPException(status_code=500, detail="Failed to process cart")
+        response.headers[REPLAY_HEADER] = "true"
+        return replay
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
         print(f"Error processing the cart: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to process cart")
     
-@router.get("/cart-submissions")
+# exclude_unset keeps cart_items out of the payload when include_items=false
+@router.get("/cart-submissions", response_model=CartSubmissionPage, response_model_exclude_unset=True)
 async def get_cart_submissions(
-    status: str = Query(None, description="Filter cart submissions by status"),  # Optional query param
+    request: Request,
+    response: Response,
+    status: StatusEnum = Query(None, description="Filter cart submissions by status"),  # Optional query param
+    created_from: datetime = Query(None, description="Only submissions created at or after this time"),
+    created_to: datetime = Query(None, description="Only submissions created before this time"),
+    activity_uuid: UUID = Query(None, description="Only submissions containing this activity"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    include_items: bool = Query(True, description="Set to false to omit cart_items in list views"),
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     # Ensure only superusers can access the resource
+    # (the `status` query param shadows fastapi.status here)
     if user.role != "superuser":
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
+            status_code=403,
             detail="You do not have permission to access this resource"
         )
 
+    # Pollers holding the current version get a 304 without the list query running
+    not_modified = conditional_response(request, response, CART_SUBMISSIONS, (await db.execute(version_query(CART_SUBMISSIONS))).first())
+    if not_modified:
+        return not_modified
+
     try:
-        # Base query with LEFT JOIN to include all CartSubmission rows
-        query = db.query(
+        columns = [
             CartSubmission.id,
             CartSubmission.user_id,
             CartSubmission.status,
-            CartSubmission.cart_items,
             CartSubmission.created_at,
             User.username,
             User.email,
             User.name,
             User.phone_number,
             User.org_name
-        ).join(User, CartSubmission.user_id == User.id)
+        ]
+        if include_items:
+            columns.append(CartSubmission.cart_items)
+        query = select(*columns).join(User, CartSubmission.user_id == User.id)
 
-        # Apply status filter if provided
+        # Apply filters if provided
         if status:
-            query = query.filter(CartSubmission.status == status)
+            query = query.where(CartSubmission.status == status)
+        if created_from:
+            query = query.where(CartSubmission.created_at >= created_from)
+        if created_to:
+            query = query.where(CartSubmission.created_at < created_to)
+        if activity_uuid:
+            query = query.where(_contains_activity(activity_uuid))
+
+        # Keyset pagination, newest first, served by ix_cart_submissions_*_created_at_id
+        if cursor:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+            query = query.where(tuple_(CartSubmission.created_at, CartSubmission.id) < tuple_(cursor_created_at, cursor_id))
+        query = query.order_by(CartSubmission.created_at.desc(), CartSubmission.id.desc()).limit(limit + 1)
 
-        # Execute the query
-        cart_submissions = query.all()
-        print(f"Fetched rows: {cart_submissions}")  # Debugging purposes
+        cart_submissions = (await db.execute(query)).all()
+        has_more = len(cart_submissions) > limit
+        cart_submissions = cart_submissions[:limit]
 
         # Serialize the data
-        serialized_data = [
-            {
+        serialized_data = []
+        for submission in cart_submissions:
+            row = {
                 "id": submission.id,
                 "status": submission.status,
-                "cart_items" : submission.cart_items,
                 "created_at": submission.created_at,
                 "user": {
                     "email": submission.email if submission.email else None,
@@ -95,44 +193,122 @@ async def get_cart_submissions(
                     "org_name" : submission.org_name if submission.org_name else None
                 }
             }
-            for submission in cart_submissions
-        ]
+            if include_items:
+                row["cart_items"] = submission.cart_items
+            serialized_data.append(row)
 
-        return {"cart_submissions": serialized_data}
+        next_cursor = None
+        if has_more:
+            last = cart_submissions[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
 
+        return {"cart_submissions": serialized_data, "next_cursor": next_cursor}
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching cart submissions: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch cart submissions")
     
+EXPORT_COLUMNS = ["id", "status", "created_at", "username", "email", "name", "phone_number", "org_name", "cart_items"]
+EXPORT_BATCH_SIZE = 1000
+
+async def _stream_export(query, export_format: str):
+    # Runs after the endpoint has returned, so it owns its session instead of using get_async_read_db
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        # One chunk per fetched batch of rows
+        async for rows in result.partitions():
+            for row in rows:
+                record = {
+                    "id": row.id,
+                    "status": row.status.value if row.status else None,
+                    "created_at": row.created_at.isoformat() if row.created_at else None,
+                    "username": row.username,
+                    "email": row.email,
+                    "name": row.name,
+                    "phone_number": row.phone_number,
+                    "org_name": row.org_name,
+                    "cart_items": row.cart_items,
+                }
+                if export_format == "csv":
+                    record["cart_items"] = json.dumps(record["cart_items"])
+                    writer.writerow([record[column] for column in EXPORT_COLUMNS])
+                else:
+                    buffer.write(json.dumps(record))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+@router.get("/cart-submissions/export")
+async def export_cart_submissions(
+    format: str = Query("ndjson", enum=["ndjson", "csv"], description="Export format"),
+    status: StatusEnum = Query(None, description="Filter cart submissions by status"),
+    created_from: datetime = Query(None, description="Only submissions created at or after this time"),
+    created_to: datetime = Query(None, description="Only submissions created before this time"),
+    activity_uuid: UUID = Query(None, description="Only submissions containing this activity"),
+    user: User = Depends(get_current_user)
+):
+    """
+    Stream every matching cart submission with user contact data as NDJSON or CSV.
+    Rows are read through a server-side cursor, so memory use stays flat.
+    """
+    if user.role != "superuser":
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have permission to access this resource"
+        )
+
+    query = select(
+        CartSubmission.id,
+        CartSubmission.status,
+        CartSubmission.created_at,
+        CartSubmission.cart_items,
+        User.username,
+        User.email,
+        User.name,
+        User.phone_number,
+        User.org_name
+    ).join(User, CartSubmission.user_id == User.id)
+    if status:
+        query = query.where(CartSubmission.status == status)
+    if created_from:
+        query = query.where(CartSubmission.created_at >= created_from)
+    if created_to:
+        query = query.where(CartSubmission.created_at < created_to)
+    if activity_uuid:
+        query = query.where(_contains_activity(activity_uuid))
+    query = query.order_by(CartSubmission.id)
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_export(query, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="cart_submissions.{format}"'}
+    )
+
 @router.get("/calculate-price/{cart_submission_id}")
-async def calculate_cart_price(cart_submission_id: int,direct_factor: float,indirect_factor: float,db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def calculate_cart_price(cart_submission_id: int,direct_factor: float,indirect_factor: float,db: AsyncSession = Depends(get_async_db), user: User = Depends(get_current_user)):
     if user.role != "superuser":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You do not have permission to access this resource"
         )
     try:
-        cart_submission = db.query(CartSubmission).filter(CartSubmission.id == cart_submission_id).first()
+        cart_submission = await db.get(CartSubmission, cart_submission_id)
         
         if not cart_submission:
             raise HTTPException(status_code=404, detail="Cart submission not found")
 
-        serialized_cart_items = cart_submission.cart_items
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        response = requests.post(
-            f"{PRICING_WEBHOOK_URL}?direct_factor={direct_factor}&indirect_factor={indirect_factor}",
-            headers=headers,
-            json=serialized_cart_items  # Use the `json` parameter to send JSON
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Pricing service failed")
-        
-        data = response.json()
+        data = await get_cart_price(cart_submission.cart_items, direct_factor, indirect_factor)
         
         # Return response with total price and components
         return {
@@ -141,17 +317,81 @@ async def calculate_cart_price(cart_submission_id: int,direct_factor: float,indi
             "components": data.get("components", [])
         }
 
+    except HTTPException:
+        raise
+    except PricingUnavailable:
+        raise HTTPException(status_code=503, detail="Pricing service is unavailable", headers={"Retry-After": str(int(settings.pricing_circuit_reset_timeout))})
+    except UnknownActivity as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         print(f"Error calculating price: {e}")
         raise HTTPException(status_code=500, detail="Failed to calculate cart price")
 
+@router.post("/calculate-price/bulk")
+async def calculate_cart_prices_bulk(request: BulkPriceRequest, db: AsyncSession = Depends(get_async_db), user: User = Depends(get_current_user)):
+    """
+    Price many cart submissions at once, selected by id or by status.
+    Results are streamed as NDJSON lines in completion order.
+    """
+    if user.role != "superuser":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You do not have permission to access this resource"
+        )
+    if not request.cart_submission_ids and not request.status:
+        raise HTTPException(status_code=400, detail="Provide cart_submission_ids or status")
+    if request.cart_submission_ids and len(request.cart_submission_ids) > settings.pricing_bulk_max_carts:
+        raise HTTPException(status_code=400, detail=f"At most {settings.pricing_bulk_max_carts} carts per request")
+
+    # Load every cart in a single query. Explicit ids are loaded whatever their status, so
+    # those filtered out by `status` can be told apart from ids that don't exist.
+    query = select(CartSubmission.id, CartSubmission.status, CartSubmission.cart_items)
+    if request.cart_submission_ids:
+        query = query.where(CartSubmission.id.in_(request.cart_submission_ids))
+    else:
+        # One row past the cap shows whether the status matches more carts than we price
+        query = query.where(CartSubmission.status == request.status).limit(settings.pricing_bulk_max_carts + 1)
+    rows = (await db.execute(query.order_by(CartSubmission.id))).all()
+    if len(rows) > settings.pricing_bulk_max_carts:
+        raise HTTPException(
+            status_code=400,
+            detail=f"More than {settings.pricing_bulk_max_carts} carts are {request.status.value}; select them by cart_submission_ids",
+        )
+    carts = {row.id: row.cart_items for row in rows if not request.status or row.status == request.status}
+    mismatched = {row.id for row in rows if row.id not in carts}
+    errors = [
+        (cart_id, f"Cart submission is not {request.status.value}" if cart_id in mismatched else "Cart submission not found")
+        for cart_id in (request.cart_submission_ids or []) if cart_id not in carts
+    ]
+
+    async def _results():
+        for cart_id, error in errors:
+            yield json.dumps({"cart_submission_id": cart_id, "error": error}) + "\n"
+        async for ids, data, error in price_many(carts, request.direct_factor, request.indirect_factor):
+            lines = []
+            for cart_id in ids:
+                if isinstance(error, UnknownActivity):
+                    lines.append({"cart_submission_id": cart_id, "error": str(error)})
+                elif error is not None:
+                    print(f"Error calculating price for cart {cart_id}: {error}")
+                    lines.append({"cart_submission_id": cart_id, "error": "Failed to calculate cart price"})
+                else:
+                    lines.append({
+                        "cart_submission_id": cart_id,
+                        "total_price": data.get("final", 0),
+                        "components": data.get("components", [])
+                    })
+            yield "".join(json.dumps(line) + "\n" for line in lines)
+
+    return StreamingResponse(_results(), media_type="application/x-ndjson")
+
 @router.post("/quote-price/{cart_submission_id}")
-async def quote_price(cart_submission_id: int,request: QuotePriceRequest, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def quote_price(cart_submission_id: int,request: QuotePriceRequest, db: AsyncSession = Depends(get_async_db), user: User = Depends(get_current_user)):
     if user.role != "superuser":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not have permission to quote prices.")
     try:
-        cart_submission = db.query(CartSubmission).filter(CartSubmission.id == cart_submission_id).first()
-        user = db.query(User).filter(User.id == cart_submission.user_id).first()
+        cart_submission = await db.get(CartSubmission, cart_submission_id)
+        user = await db.get(User, cart_submission.user_id) if cart_submission else None
         
         if not cart_submission or not user:
             raise HTTPException(status_code=404, detail="Cart submission or user not found")
@@ -159,12 +399,24 @@ async def quote_price(cart_submission_id: int,request: QuotePriceRequest, db: Se
         subject = "Your Cart Quote"
         content = f"Hello {user.name},\n\nYour cart has been reviewed. The quoted price for your cart is ${request.quoted_price}.\n\nThank you for your patience!"
         
-        send_email(user.email, subject, content)
-        cart_submission.status = "replied"
-        db.commit()
+        enqueue_email(db, user.email, subject, content)
+        # Conditional update, so a cart quoted twice is only counted as replied once
+        replied = (await db.execute(
+            update(CartSubmission)
+            .where(CartSubmission.id == cart_submission_id, CartSubmission.status == StatusEnum.pending)
+            .values(status=StatusEnum.replied)
+            .returning(CartSubmission.id)
+        )).first()
+        if replied:
+            await record_reply(db, cart_submission_id, user.org_name)
+            await emit(db, "cart_replied", cart_submission_id=cart_submission_id)
+            await db.execute(bump_version(db, CART_SUBMISSIONS))
+        await db.commit()
         
         return {"message": "Quoted price sent to the user via email", "quoted_price": request.quoted_price}
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error quoting price: {e}")
         raise HTTPException(status_code=500, detail="Failed to quote price")
@@ -0,0 +1,140 @@
+"""
+One-off database bootstrap and data migrations, run as deploy steps instead of on
+every worker boot:
+
+    python -m app.bootstrap                        # create extensions, tables and missing indexes
+    python -m app.bootstrap backfill-cart-items    # copy existing JSON cart lines into cart_items
+    python -m app.bootstrap refresh-analytics      # rebuild the demand rollups from cart_items
+    python -m app.bootstrap purge-idempotency-keys # delete expired Idempotency-Key rows
+    python -m app.bootstrap sweep-sessions         # delete expired and long-revoked user sessions
+    python -m app.bootstrap purge-role-changes     # delete role_changes rows every worker has synced
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from sqlalchemy import select, insert, delete, exists
+from app.core.db import Base, SessionLocal, AsyncSessionLocal, get_engine, ensure_extensions, ensure_indexes
+# Importing the models registers their tables on Base.metadata
+from app.models import analytics, cart, idempotency, outbox, pricing, session, user, versions  # noqa: F401
+from app.models.cart import CartSubmission, CartLineItem
+from app.models.idempotency import IdempotencyKey
+
+
+def create_schema(args=None):
+    engine = get_engine()
+    ensure_extensions(engine)
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(engine)
+
+
+def backfill_cart_items(args):
+    """
+    Write cart_items rows for submissions that predate the table, one committed batch
+    at a time so it can be stopped and resumed. Submissions that already have line
+    items are skipped.
+    """
+    last_id, submissions, lines = 0, 0, 0
+    while True:
+        db = SessionLocal()
+        try:
+            batch = db.execute(
+                select(CartSubmission.id, CartSubmission.cart_items)
+                .where(CartSubmission.id > last_id)
+                .where(~exists().where(CartLineItem.submission_id == CartSubmission.id))
+                .order_by(CartSubmission.id)
+                .limit(args.batch_size)
+            ).all()
+            if not batch:
+                break
+            rows = [
+                {"submission_id": submission.id, "activity_uuid": item["uuid"],
+                 "activity_name": item["activity_name"], "quantity": item["quantity"]}
+                for submission in batch
+                for item in submission.cart_items or []
+            ]
+            if rows:
+                db.execute(insert(CartLineItem), rows)
+            db.commit()
+        finally:
+            db.close()
+        last_id = batch[-1].id
+        submissions += len(batch)
+        lines += len(rows)
+        print(f"backfilled {submissions} submissions, {lines} line items (up to id {last_id})")
+
+
+def refresh_analytics(args):
+    from app.core.analytics import refresh_analytics
+
+    async def refresh():
+        async with AsyncSessionLocal() as db:
+            await refresh_analytics(db)
+
+    asyncio.run(refresh())
+
+
+def purge_idempotency_keys(args):
+    """
+    Delete expired keys in batches, keeping each delete transaction short.
+    """
+    now, purged = datetime.utcnow(), 0
+    while True:
+        db = SessionLocal()
+        try:
+            expired = select(IdempotencyKey.id).where(IdempotencyKey.expires_at <= now).limit(args.batch_size)
+            deleted = db.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired)).execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        purged += deleted
+        if deleted < args.batch_size:
+            break
+    print(f"purged {purged} expired idempotency keys")
+
+
+def sweep_sessions(args):
+    from app.core.sessions import sweep_sessions
+
+    async def sweep():
+        async with AsyncSessionLocal() as db:
+            return await sweep_sessions(db, args.batch_size)
+
+    print(f"swept {asyncio.run(sweep())} sessions")
+
+
+def purge_role_changes(args):
+    from app.core.dependencies import purge_role_changes
+
+    async def purge():
+        async with AsyncSessionLocal() as db:
+            return await purge_role_changes(db)
+
+    print(f"purged {asyncio.run(purge())} role changes")
+
+
+COMMANDS = {
+    "schema": create_schema,
+    "backfill-cart-items": backfill_cart_items,
+    "refresh-analytics": refresh_analytics,
+    "purge-idempotency-keys": purge_idempotency_keys,
+    "sweep-sessions": sweep_sessions,
+    "purge-role-changes": purge_role_changes,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="schema", choices=sorted(COMMANDS))
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per committed batch for backfills")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    COMMANDS[args.command](args)
+    print(f"{args.command}: done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import select, update, delete, func, case, distinct, literal, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, dialect_insert
+from app.models.analytics import ActivityDemand, OrgDemand
+from app.models.cart import CartSubmission, CartLineItem, StatusEnum
+from app.models.user import User
+
+# Incremental maintenance of the demand rollups. Writers call record_submission /
+# record_reply inside their own transaction; refresh_analytics rebuilds both tables
+# from cart_items to pick up history and correct any drift.
+
+
+def _upsert(insert, model, key):
+    stmt = insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            "cart_count": model.cart_count + stmt.excluded.cart_count,
+            "total_quantity": model.total_quantity + stmt.excluded.total_quantity,
+            "pending_count": model.pending_count + stmt.excluded.pending_count,
+            "replied_count": model.replied_count + stmt.excluded.replied_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+async def record_submission(db: AsyncSession, org_name, cart_items):
+    """
+    Count a new pending cart towards its activities and organisation.
+    """
+    now = datetime.utcnow()
+    quantities, names = defaultdict(int), {}
+    for item in cart_items:
+        quantities[item["uuid"]] += item["quantity"]
+        names[item["uuid"]] = item["activity_name"]
+
+    insert = dialect_insert(db)
+    if quantities:
+        # Sorted so concurrent carts lock shared rows in the same order
+        await db.execute(_upsert(insert, ActivityDemand, ActivityDemand.activity_uuid), [
+            {"activity_uuid": uuid, "activity_name": names[uuid], "cart_count": 1, "total_quantity": quantities[uuid],
+             "pending_count": 1, "replied_count": 0, "updated_at": now}
+            for uuid in sorted(quantities)
+        ])
+    await db.execute(_upsert(insert, OrgDemand, OrgDemand.org_name), [
+        {"org_name": org_name or "", "cart_count": 1, "total_quantity": sum(quantities.values()),
+         "pending_count": 1, "replied_count": 0, "updated_at": now}
+    ])
+
+
+async def record_reply(db: AsyncSession, cart_submission_id: int, org_name):
+    """
+    Move a cart from pending to replied. Only call this once per submission, for the
+    transaction that actually changed its status.
+    """
+    now = datetime.utcnow()
+    activities = select(CartLineItem.activity_uuid).where(CartLineItem.submission_id == cart_submission_id)
+    await db.execute(
+        update(ActivityDemand)
+        .where(ActivityDemand.activity_uuid.in_(activities))
+        .values(pending_count=ActivityDemand.pending_count - 1, replied_count=ActivityDemand.replied_count + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(OrgDemand)
+        .where(OrgDemand.org_name == (org_name or ""))
+        .values(pending_count=OrgDemand.pending_count - 1, replied_count=OrgDemand.replied_count + 1, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _count_status(status: StatusEnum):
+    return func.count(distinct(case((CartSubmission.status == status, CartSubmission.id))))
+
+
+async def refresh_analytics(db: AsyncSession):
+    """
+    Rebuild both rollups from cart_items in one transaction.
+    """
+    now = literal(datetime.utcnow())
+    if db.get_bind().dialect.name == "postgresql":
+        # Blocks incremental writers until the rebuild commits, so none of their updates are lost
+        await db.execute(text("LOCK TABLE activity_demand, org_demand IN EXCLUSIVE MODE"))
+
+    await db.execute(delete(ActivityDemand))
+    await db.execute(ActivityDemand.__table__.insert().from_select(
+        ["activity_uuid", "activity_name", "cart_count", "total_quantity", "pending_count", "replied_count", "updated_at"],
+        select(
+            CartLineItem.activity_uuid,
+            func.max(CartLineItem.activity_name),
+            func.count(distinct(CartLineItem.submission_id)),
+            func.sum(CartLineItem.quantity),
+            _count_status(StatusEnum.pending),
+            _count_status(StatusEnum.replied),
+            now,
+        )
+        .join(CartSubmission, CartSubmission.id == CartLineItem.submission_id)
+        .group_by(CartLineItem.activity_uuid)
+    ))
+
+    org_name = func.coalesce(User.org_name, "")
+    await db.execute(delete(OrgDemand))
+    await db.execute(OrgDemand.__table__.insert().from_select(
+        ["org_name", "cart_count", "total_quantity", "pending_count", "replied_count", "updated_at"],
+        select(
+            org_name,
+            func.count(distinct(CartSubmission.id)),
+            func.coalesce(func.sum(CartLineItem.quantity), 0),
+            _count_status(StatusEnum.pending),
+            _count_status(StatusEnum.replied),
+            now,
+        )
+        .join(User, CartSubmission.user_id == User.id)
+        .outerjoin(CartLineItem, CartLineItem.submission_id == CartSubmission.id)
+        .group_by(org_name)
+    ))
+    await db.commit()
+
+
+async def run_analytics_refresher(stop: asyncio.Event):
+    # Waits a full interval first, so restarting workers don't all rebuild at once
+    while True:
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.analytics_refresh_interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            async with AsyncSessionLocal() as db:
+                await refresh_analytics(db)
+        except Exception as e:
+            print(f"Error refreshing analytics: {e}")
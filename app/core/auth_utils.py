@@ -6,19 +6,22 @@ from fastapi import HTTPException,status
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+ACCESS_TOKEN_TTL = timedelta(hours=48)
+REFRESH_TOKEN_TTL = timedelta(days=7)
+
 def get_password_hash(password: str):
     return pwd_context.hash(password)
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-def create_access_token(data: dict, expires_delta: timedelta = timedelta(hours=48)):
+def create_access_token(data: dict, expires_delta: timedelta = ACCESS_TOKEN_TTL):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.jwt_secret_key, algorithm="HS256")
 
-def create_refresh_token(data: dict, expires_delta: timedelta = timedelta(days=7)):
+def create_refresh_token(data: dict, expires_delta: timedelta = REFRESH_TOKEN_TTL):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small thread-safe LRU cache whose entries expire after `ttl` seconds.
+    Keeps hit/miss counters so callers can report cache effectiveness.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+class LazyTTLCache:
+    """
+    TTLCache whose size and ttl are read the first time it is used, so module-level
+    caches sized from settings don't need the environment at import time.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> TTLCache:
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    self._cache = TTLCache(maxsize=self._maxsize(), ttl=self._ttl())
+        return self._cache
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
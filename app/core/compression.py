@@ -0,0 +1,117 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # pinned in requirements.txt; if it is missing only gzip is offered
+    brotli = None
+
+# Negotiated response compression. Like Starlette's GZipMiddleware, but prefers brotli
+# when the client accepts it and the package is installed, flushes each streamed chunk
+# so NDJSON/CSV exports still arrive incrementally, and leaves event streams alone.
+
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+class _Gzip:
+    encoding = "gzip"
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    encoding = "br"
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = None, gzip_level: int = None, brotli_quality: int = None):
+        # Unset options come from settings, read when Starlette builds the middleware stack
+        self.app = app
+        self.minimum_size = settings.compression_minimum_size if minimum_size is None else minimum_size
+        self.gzip_level = settings.gzip_compresslevel if gzip_level is None else gzip_level
+        self.brotli_quality = settings.brotli_quality if brotli_quality is None else brotli_quality
+
+    def _negotiate(self, scope):
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return lambda: _Brotli(self.brotli_quality)
+        if "gzip" in accepted:
+            return lambda: _Gzip(self.gzip_level)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        make_compressor = self._negotiate(scope)
+        if make_compressor is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether compressing is worth it
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            final = not message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                skip = (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith(UNCOMPRESSED_TYPES)
+                    or (final and len(body) < self.minimum_size)
+                )
+                if not skip:
+                    compressor = make_compressor()
+                    headers["Content-Encoding"] = compressor.encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    if "content-length" in headers:
+                        del headers["content-length"]
+                    body = compressor.compress(body, final)
+                    if final:
+                        headers["Content-Length"] = str(len(body))
+                    message = dict(message, body=body)
+                await send(start_message)
+                start_message = None
+            elif compressor is not None:
+                message = dict(message, body=compressor.compress(body, final))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
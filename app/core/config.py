@@ -1,5 +1,22 @@
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
+class LoadShedPool(BaseModel):
+    # Requests whose path starts with one of these prefixes share this pool's limits
+    prefixes: List[str]
+    max_in_flight: int
+    max_queue: int = 0
+    queue_timeout: float = 1.0
+    # Priority pools may also use the capacity reserved in load_shed_reserved
+    priority: bool = False
+
+
+# Async driver used for each backend when db_url is given as a plain (sync) URL
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
 class Settings(BaseSettings):
     pg_host: str
     pg_port: str
@@ -16,14 +33,148 @@ class Settings(BaseSettings):
     twilio_sms_sender: str
     db_port: str
     # pg_database_url: str
+    # Full SQLAlchemy URL overriding the PG_* settings, e.g. sqlite:///dev.db for local runs
+    db_url: Optional[str] = None
     pricing_webhook_url: str
+    # Connection pool budget per worker process and per database server. The sync and
+    # async engines of a server split it (db_async_pool_share goes to the async one), so a
+    # worker opens at most db_pool_size + db_max_overflow connections to the primary, plus
+    # one more with events_pg_bridge, and the same again to the replica when configured.
+    # Across a deployment that is multiplied by the worker count (WEB_CONCURRENCY / gunicorn
+    # -w) and has to stay below the server's max_connections, less what other clients use:
+    #     workers * (db_pool_size + db_max_overflow + 1) < max_connections
+    # Size/overflow/timeout are dropped for engines without a QueuePool (aiosqlite uses NullPool).
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_async_pool_share: float = 0.5
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    # Run `python -m app.bootstrap` from the app's lifespan instead of as a deploy step (local dev)
+    db_bootstrap_on_startup: bool = False
+    # Optional read-only replica used by the admin list/search endpoints
+    pg_replica_host: Optional[str] = None
+    pg_replica_port: Optional[str] = None
+    query_count_warning_threshold: int = 20
+    principal_cache_size: int = 10000
+    principal_cache_ttl: int = 60
+    principal_sync_interval: float = 5.0  # how often each worker picks up role changes made by others
+    role_change_purge_interval: float = 3600.0  # 0 leaves purging to `python -m app.bootstrap purge-role-changes`
+    role_request_counts_ttl: int = 10
+    # App worker processes on this host; uvicorn --workers and gunicorn both default to
+    # WEB_CONCURRENCY, so setting it there keeps the per-worker pools below in proportion
+    web_concurrency: int = 1
+    hash_pool_workers: int = 0  # 0 = this worker's share of the CPU cores, cpu_count // web_concurrency
+    hash_pool_concurrency: int = 0  # 0 = same as hash_pool_workers
+    hash_pool_queue_limit: int = 64
+    sendgrid_api_url: str = "https://api.sendgrid.com"
+    email_outbox_worker_enabled: bool = True
+    email_outbox_batch_size: int = 50
+    email_outbox_poll_interval: float = 2.0
+    email_outbox_timeout: float = 10.0
+    email_outbox_max_attempts: int = 8
+    email_outbox_backoff_base: float = 5.0
+    email_outbox_backoff_max: float = 600.0
+    pricing_cache_size: int = 4096
+    pricing_cache_ttl: int = 3600
+    pricing_cache_persist: bool = False
+    pricing_timeout: float = 10.0
+    pricing_max_connections: int = 20
+    pricing_max_retries: int = 2
+    pricing_retry_backoff: float = 0.2
+    pricing_circuit_failure_threshold: int = 5
+    pricing_circuit_reset_timeout: float = 30.0
+    pricing_bulk_concurrency: int = 8
+    pricing_bulk_max_carts: int = 1000
+    pricing_backend: Literal["webhook", "local"] = "webhook"  # "local" prices in-process, see app.core.pricing_engine
+    pricing_cost_table_path: str = "pricing_costs.csv"
+    # Seconds between full rebuilds of the demand rollups in each worker; 0 leaves it to
+    # `python -m app.bootstrap refresh-analytics` run from cron
+    analytics_refresh_interval: float = 0
+    # How long submit-cart remembers an Idempotency-Key and its response
+    idempotency_key_ttl: int = 86400
+    # Without a key, treat an identical cart from the same user within this many seconds
+    # as a retry of the first one; 0 disables
+    cart_dedup_window: int = 0
+    # Responses smaller than this many bytes are sent uncompressed
+    compression_minimum_size: int = 1024
+    gzip_compresslevel: int = 6
+    brotli_quality: int = 4
+    # Admin event stream (app.core.events)
+    events_client_buffer: int = 100  # events queued per client before it is disconnected
+    events_max_clients: int = 200  # per worker
+    events_keepalive_interval: float = 15.0
+    events_token_ttl: int = 60  # seconds an EventSource ?token= stays valid for opening the stream
+    events_pg_bridge: bool = False  # fan out across workers with Postgres LISTEN/NOTIFY
+    events_pg_channel: str = "jigyasu_events"
+    events_bridge_reconnect_delay: float = 2.0
+    # Refresh-token sessions (app.core.sessions)
+    session_revocation_sync_interval: float = 10.0
+    session_refresh_grace: float = 10.0  # seconds the previous refresh token still returns the current pair
+    session_sweep_interval: float = 3600.0  # 0 leaves sweeping to `python -m app.bootstrap sweep-sessions`
+    session_sweep_batch_size: int = 1000
+    # Load shedding (app.core.load_shedding). Pools are matched in order; unmatched paths
+    # share the "default" limits. The expensive pools are kept well below the DB pool
+    # (their engine's share of db_pool_size + db_max_overflow) because they hold a
+    # session while waiting on I/O.
+    load_shed_enabled: bool = True
+    load_shed_max_in_flight: int = 200  # across all pools
+    load_shed_reserved: int = 20  # of which only priority pools may use the last N
+    load_shed_retry_after: int = 1
+    load_shed_exempt_prefixes: List[str] = ["/api/events/", "/metrics"]
+    load_shed_pools: Dict[str, LoadShedPool] = {
+        "auth": LoadShedPool(
+            prefixes=["/api/auth/get-role", "/api/auth/refresh", "/api/auth/login", "/api/auth/logout", "/api/auth/sessions"],
+            max_in_flight=64, max_queue=128, queue_timeout=5.0, priority=True,
+        ),
+        "pricing": LoadShedPool(prefixes=["/api/cart/calculate-price"], max_in_flight=6, max_queue=24, queue_timeout=2.0),
+        "cart_writes": LoadShedPool(prefixes=["/api/cart/submit-cart", "/api/cart/quote-price"], max_in_flight=8, max_queue=32, queue_timeout=2.0),
+        "default": LoadShedPool(prefixes=[], max_in_flight=64, max_queue=128, queue_timeout=2.0),
+    }
     @property
     def database_url(self):
+        if self.db_url:
+            return self.db_url
         return f"postgresql://{self.pg_user}:{self.pg_password}@{self.pg_host}:{self.pg_port}/{self.pg_db}"
 
+    @property
+    def async_database_url(self):
+        if self.db_url:
+            backend = self.db_url.split(":", 1)[0].split("+", 1)[0]
+            return ASYNC_DRIVERS[backend] + self.db_url[self.db_url.index(":"):]
+        return f"postgresql+asyncpg://{self.pg_user}:{self.pg_password}@{self.pg_host}:{self.pg_port}/{self.pg_db}"
+
+    @property
+    def replica_database_url(self):
+        if not self.pg_replica_host:
+            return None
+        return f"postgresql://{self.pg_user}:{self.pg_password}@{self.pg_replica_host}:{self.pg_replica_port or self.pg_port}/{self.pg_db}"
+
+    @property
+    def async_replica_database_url(self):
+        if not self.pg_replica_host:
+            return None
+        return f"postgresql+asyncpg://{self.pg_user}:{self.pg_password}@{self.pg_replica_host}:{self.pg_replica_port or self.pg_port}/{self.pg_db}"
+
     class Config:
         env_file = ".env"
         extra = "allow"  # This allows extra environment variables
 
 
-settings = Settings()
\ No newline at end of file
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+class _LazySettings:
+    """
+    Module-level `settings` that reads the environment on first attribute access
+    instead of at import time.
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+
+settings = _LazySettings()
\ No newline at end of file
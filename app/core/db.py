@@ -1,15 +1,183 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateIndex
 from .config import settings
+from .instrumentation import instrument_engine
+from . import metrics
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Engines are created lazily on first use rather than at import, so importing the app
+# (e.g. gunicorn --preload) opens no connections, and each forked worker builds its own.
+_engines = {}
+
+def _split_budget(total: int, async_share: float):
+    """
+    Splits one connection budget between a sync engine and its async twin, giving each
+    at least one connection when the budget allows (a QueuePool size of 0 means unbounded).
+    """
+    async_part = round(total * async_share)
+    if total >= 2:
+        async_part = min(max(async_part, 1), total - 1)
+    return total - async_part, async_part
+
+def _pool_options(url: str, flavour: str):
+    options = {
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    # Sizing only applies to queue pools; e.g. aiosqlite's NullPool rejects these
+    url = make_url(url)
+    if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+        # The sync and async engines of one database share db_pool_size/db_max_overflow
+        # rather than each getting the full amount; see Settings.db_pool_size
+        index = 0 if flavour == "sync" else 1
+        options.update(
+            pool_size=max(_split_budget(settings.db_pool_size, settings.db_async_pool_share)[index], 1),
+            max_overflow=_split_budget(settings.db_max_overflow, settings.db_async_pool_share)[index],
+            pool_timeout=settings.db_pool_timeout,
+        )
+    return options
+
+def _create(name):
+    if name == "primary":
+        engine = create_engine(settings.database_url, **_pool_options(settings.database_url, "sync"))
+    elif name == "primary_async":
+        # asyncpg-backed engine for the async endpoints, so DB round trips don't block the event loop
+        engine = create_async_engine(settings.async_database_url, **_pool_options(settings.async_database_url, "async"))
+    elif name == "replica":
+        engine = create_engine(settings.replica_database_url, **_pool_options(settings.replica_database_url, "sync"))
+    else:
+        engine = create_async_engine(settings.async_replica_database_url, **_pool_options(settings.async_replica_database_url, "async"))
+    instrument_engine(getattr(engine, "sync_engine", engine))
+    return engine
+
+def _get(name):
+    engine = _engines.get(name)
+    if engine is None:
+        engine = _engines[name] = _create(name)
+    return engine
+
+def get_engine():
+    return _get("primary")
+
+def get_async_engine():
+    return _get("primary_async")
+
+# Read-only replica for admin list/search endpoints; falls back to the primary when not configured
+def get_read_engine():
+    return _get("replica") if settings.replica_database_url else get_engine()
+
+def get_async_read_engine():
+    return _get("replica_async") if settings.replica_database_url else get_async_engine()
+
+def _forget_engines_after_fork():
+    # Pooled connections inherited from the parent must not be used (or closed) by the child
+    for engine in _engines.values():
+        getattr(engine, "sync_engine", engine).dispose(close=False)
+    _engines.clear()
+
+os.register_at_fork(after_in_child=_forget_engines_after_fork)
+
+def __getattr__(name):
+    # Lazy module attributes for code that still imports `engine` / `async_engine`
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(name)
+
+
+class _LazySessionFactory:
+    """
+    Callable like a sessionmaker, binding to its engine the first time it is used.
+    """
+
+    def __init__(self, maker, get_bind, **options):
+        self._maker = maker
+        self._get_bind = get_bind
+        self._options = options
+
+    def __call__(self, **kwargs):
+        return self._maker(bind=self._get_bind(), **self._options)(**kwargs)
+
+
+SessionLocal = _LazySessionFactory(sessionmaker, get_engine, autocommit=False, autoflush=False)
+AsyncSessionLocal = _LazySessionFactory(async_sessionmaker, get_async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = _LazySessionFactory(sessionmaker, get_read_engine, autocommit=False, autoflush=False)
+AsyncReadSessionLocal = _LazySessionFactory(async_sessionmaker, get_async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def _pool_stats():
+    stats = {}
+    for name, engine in list(_engines.items()):
+        pool = getattr(engine, "sync_engine", engine).pool
+        if not isinstance(pool, QueuePool):
+            continue
+        stats[f'db_pool_size{{engine="{name}"}}'] = pool.size()
+        stats[f'db_pool_checked_out{{engine="{name}"}}'] = pool.checkedout()
+        stats[f'db_pool_checked_in{{engine="{name}"}}'] = pool.checkedin()
+        stats[f'db_pool_overflow{{engine="{name}"}}'] = pool.overflow()
+    return stats
+
+metrics.register_collector(_pool_stats)
+
+POSTGRES_EXTENSIONS = ["pg_trgm"]
+
+def ensure_extensions(bind):
+    """
+    Create the Postgres extensions our indexes depend on (pg_trgm for search).
+    """
+    if bind.dialect.name != "postgresql":
+        return
+    with bind.begin() as conn:
+        for extension in POSTGRES_EXTENSIONS:
+            conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+
+def ensure_indexes(bind):
+    """
+    create_all() skips tables that already exist, so indexes added to existing
+    models later on have to be created separately.
+    """
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+def dialect_insert(db):
+    """
+    The dialect-specific insert() of the session's database, for ON CONFLICT upserts.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"upserts are not supported on {dialect}")
+    return insert
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
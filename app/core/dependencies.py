@@ -1,19 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
 from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.core.db import get_db
-from app.models.user import User
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.db import get_async_db
+from app.core.cache import LazyTTLCache
+from app.core.config import settings
+from app.core import metrics
+from app.core.periodic import SYNC_OVERLAP, run_periodic_sync, sync_since
+from app.models.user import User, RoleChange
+from app.schemas.auth import Principal
 from app.core.auth_utils import verify_token
+from app.core.sessions import is_revoked
 from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, Header, status
+from fastapi import Depends, HTTPException, Header, Query, status
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# username -> Principal, so repeated calls skip the users lookup. Role changes are
+# recorded in role_changes and every worker drops the affected entries on its next
+# sync, so a changed role is honoured everywhere within principal_sync_interval.
+principal_cache = LazyTTLCache(lambda: settings.principal_cache_size, lambda: settings.principal_cache_ttl)
+metrics.register_collector(lambda: {
+    f"principal_cache_{key}": value for key, value in principal_cache.stats().items()
+})
+
+_role_changes_synced_until = None
+
+def invalidate_principal(username: str):
+    """
+    Drop a cached principal, e.g. after the user's role has changed.
+    Only affects this worker; use record_role_change for the others.
+    """
+    principal_cache.invalidate(username)
+
+def record_role_change(db, usernames):
+    """
+    Add role_changes rows for the users whose role the caller is changing, so other
+    workers invalidate them too. The caller commits, then calls invalidate_principal.
+    """
+    db.add_all([RoleChange(username=username) for username in usernames])
+
+async def sync_role_changes(db: AsyncSession):
+    global _role_changes_synced_until
+    now = datetime.utcnow()
+    # Anything cached before the horizon has expired on its own
+    horizon = now - timedelta(seconds=settings.principal_cache_ttl)
+    since = sync_since(_role_changes_synced_until, horizon)
+    usernames = (await db.execute(
+        select(RoleChange.username).where(RoleChange.changed_at >= since).distinct()
+    )).scalars().all()
+    for username in usernames:
+        principal_cache.invalidate(username)
+    _role_changes_synced_until = now
+
+async def purge_role_changes(db: AsyncSession) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.principal_cache_ttl) - SYNC_OVERLAP
+    deleted = (await db.execute(delete(RoleChange).where(RoleChange.changed_at < cutoff))).rowcount
+    await db.commit()
+    return deleted
+
+async def run_principal_sync(stop: asyncio.Event):
+    await run_periodic_sync(
+        stop, "syncing role changes", sync_role_changes, lambda: settings.principal_sync_interval,
+        cleanup=purge_role_changes, cleanup_interval=lambda: settings.role_change_purge_interval,
+    )
+
+def _check_token(token: str, scope: str = None) -> dict:
     payload = verify_token(token)
-    if not payload:
+    # Scoped tokens (e.g. the event stream's) are only accepted where that scope is asked for
+    if not payload or payload.get("scope") != scope:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    # Tokens issued before sessions existed carry no sid
+    session_id = payload.get("sid")
+    if session_id is not None and is_revoked(session_id):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session has been revoked")
+    return payload
+
+def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    return _check_token(token)
+
+def get_stream_token_payload(
+    token: Optional[str] = Query(None, description="Short-lived token from POST /api/events/stream-token"),
+    bearer: Optional[str] = Depends(optional_oauth2_scheme),
+) -> dict:
+    """
+    Like get_token_payload, but also accepts an events-scoped token in the query string,
+    since browsers' EventSource can't send an Authorization header.
+    """
+    if token:
+        return _check_token(token, scope="events")
+    if bearer:
+        return _check_token(bearer)
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+
+async def get_current_user(payload: dict = Depends(get_token_payload), db: AsyncSession = Depends(get_async_db)):
     username = payload.get("sub")
-    user = db.query(User).filter(User.username == username).first()
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
\ No newline at end of file
+    principal = Principal.model_validate(user)
+    principal_cache.set(username, principal)
+    return principal
@@ -1,23 +1,10 @@
-import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from app.models.outbox import EmailOutbox
 
-SENDGRID_API_KEY = os.getenv('TWILLIO_SENDGRID_API_KEY')
-REGISTERED_FROM_MAIL = os.getenv('REGISTERED_FROM_MAIL')
-
-def send_email(to_email: str, subject: str, content: str):
+def enqueue_email(db, to_email: str, subject: str, content: str):
     """
-    Function to send an email using SendGrid API.
+    Queue an email in the outbox as part of the caller's transaction.
+    It is delivered by the outbox worker once the transaction commits.
     """
-    message = Mail(
-        from_email=REGISTERED_FROM_MAIL,
-        to_emails=to_email,
-        subject=subject,
-        plain_text_content=content
-    )
-    try:
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
-        print(f"Email sent to {to_email}, Status Code: {response.status_code}")
-    except Exception as e:
-        print(f"Error sending email: {e}")
\ No newline at end of file
+    message = EmailOutbox(to_email=to_email, subject=subject, content=content)
+    db.add(message)
+    return message
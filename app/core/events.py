@@ -0,0 +1,148 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+import asyncpg
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+from .config import settings
+from . import metrics
+
+# Push channel for admin clients. Endpoints call emit() before committing; events are
+# fanned out to this worker's subscribers once the transaction commits. With
+# EVENTS_PG_BRIDGE on Postgres, emit() issues pg_notify instead (also delivered only
+# on commit) and every worker's listener fans the event out locally.
+
+events_published = metrics.Counter("events_published_total", "Events fanned out to local subscribers", labels=("type",))
+events_clients = metrics.Gauge("events_clients", "Connected event stream clients")
+events_dropped_clients = metrics.Counter("events_dropped_clients_total", "Event stream clients disconnected for falling behind")
+
+_PENDING = "pending_events"
+_CLOSED = object()
+
+
+class EventBroker:
+    """
+    In-process fan-out to bounded per-client queues. A client whose queue fills up
+    is disconnected rather than buffered without limit; it reconnects and refetches.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._loop = None
+
+    def subscribe(self) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=settings.events_client_buffer)
+        self._subscribers.add(queue)
+        events_clients.set(len(self._subscribers))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        events_clients.set(len(self._subscribers))
+
+    def publish(self, event: dict):
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(event)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, event)
+
+    def _fan_out(self, event):
+        events_published.inc(type=event.get("type", ""))
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                events_dropped_clients.inc()
+                self._close(queue)
+
+    def _close(self, queue):
+        self.unsubscribe(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_CLOSED)
+
+    def close(self):
+        # Ends every open stream, e.g. on shutdown
+        for queue in list(self._subscribers):
+            self._close(queue)
+
+    @property
+    def client_count(self) -> int:
+        return len(self._subscribers)
+
+
+broker = EventBroker()
+
+
+def is_closed(event) -> bool:
+    return event is _CLOSED
+
+
+def _bridge_active(db) -> bool:
+    return settings.events_pg_bridge and db.get_bind().dialect.name == "postgresql"
+
+
+async def emit(db, event_type: str, **data):
+    """
+    Queue an event on the session's transaction; it is published only if the
+    transaction commits. `db` is an AsyncSession.
+    """
+    payload = {"type": event_type, "data": data, "at": datetime.now(timezone.utc).isoformat()}
+    if _bridge_active(db):
+        await db.execute(select(func.pg_notify(settings.events_pg_channel, json.dumps(payload))))
+    else:
+        db.sync_session.info.setdefault(_PENDING, []).append(payload)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for payload in session.info.pop(_PENDING, []):
+        broker.publish(payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(_PENDING, None)
+
+
+async def run_event_bridge(stop: asyncio.Event):
+    """
+    LISTEN on the events channel and publish whatever arrives to the local broker,
+    reconnecting with a short delay when the connection drops.
+    """
+    def on_notify(connection, pid, channel, payload):
+        try:
+            broker.publish(json.loads(payload))
+        except ValueError as e:
+            print(f"Dropping malformed event payload: {e}")
+
+    while not stop.is_set():
+        connection = None
+        lost = asyncio.Event()
+        try:
+            connection = await asyncpg.connect(settings.database_url)
+            connection.add_termination_listener(lambda _: lost.set())
+            await connection.add_listener(settings.events_pg_channel, on_notify)
+            stopped = asyncio.ensure_future(stop.wait())
+            dropped = asyncio.ensure_future(lost.wait())
+            await asyncio.wait({stopped, dropped}, return_when=asyncio.FIRST_COMPLETED)
+            stopped.cancel()
+            dropped.cancel()
+        except Exception as e:
+            print(f"Event bridge connection error: {e}")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        if not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.events_bridge_reconnect_delay)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,114 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from .auth_utils import get_password_hash, verify_password
+from .config import settings
+from . import metrics
+
+# bcrypt is pure CPU work, so it runs in a process pool instead of occupying Starlette's
+# shared threadpool. Every app worker has its own pool, so by default each takes its
+# share of the cores (see Settings.web_concurrency) rather than one process per core.
+
+hash_latency = metrics.Histogram(
+    "password_hash_seconds", "Time spent hashing/verifying passwords in the worker pool", labels=("op",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+hash_queue_depth = metrics.Gauge("password_hash_queue_depth", "Password hash jobs waiting for a pool slot")
+hash_in_flight = metrics.Gauge("password_hash_in_flight", "Password hash jobs running in the pool")
+hash_rejected = metrics.Counter("password_hash_rejected_total", "Password hash jobs rejected by admission control")
+
+_executor = None
+_semaphore = None
+_admitted = 0
+
+
+def _workers() -> int:
+    return settings.hash_pool_workers or max((os.cpu_count() or 1) // max(settings.web_concurrency, 1), 1)
+
+
+def _concurrency() -> int:
+    return settings.hash_pool_concurrency or _workers()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # Children come from a forkserver rather than being forked from this process,
+        # which already runs the event loop and threadpool threads
+        _executor = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context("forkserver"))
+    return _executor
+
+
+def _discard_executor(broken):
+    global _executor
+    if _executor is broken:
+        _executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def _submit(fn, *args):
+    # A child that died (OOM kill, crash) breaks the whole pool; rebuild it and retry once
+    # so one lost worker doesn't turn every later login into a 500
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    try:
+        return await loop.run_in_executor(executor, fn, *args)
+    except BrokenProcessPool:
+        print("Password hash pool broken, restarting it")
+        _discard_executor(executor)
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(_concurrency())
+    return _semaphore
+
+
+async def _run(op: str, fn, *args):
+    global _admitted
+    if _admitted >= _concurrency() + settings.hash_pool_queue_limit:
+        hash_rejected.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    _admitted += 1
+    waiting = True
+    hash_queue_depth.inc()
+    try:
+        async with _get_semaphore():
+            waiting = False
+            hash_queue_depth.dec()
+            hash_in_flight.inc()
+            start = time.perf_counter()
+            try:
+                return await _submit(fn, *args)
+            finally:
+                hash_latency.observe(time.perf_counter() - start, op=op)
+                hash_in_flight.dec()
+    finally:
+        if waiting:
+            hash_queue_depth.dec()
+        _admitted -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run("hash", get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run("verify", verify_password, plain_password, hashed_password)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
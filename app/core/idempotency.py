@@ -0,0 +1,48 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.idempotency import IdempotencyKey
+
+# Idempotency-Key support for write endpoints. The key row is inserted in the same
+# transaction as the write it guards: a concurrent retry with the same key blocks on
+# the unique constraint and fails once the first commits, then replays its response.
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+async def find_replay(db: AsyncSession, user_id: int, key: str, fingerprint: str):
+    """
+    Stored response for an unexpired key, or None. Expired keys are deleted so the
+    request runs again; a key reused for a different payload is rejected.
+    """
+    row = (await db.execute(
+        select(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    )).scalar_one_or_none()
+    if row is None:
+        return None
+    if row.expires_at <= datetime.utcnow():
+        await db.delete(row)
+        await db.flush()
+        return None
+    if row.request_hash != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    return row.response
+
+
+async def claim_key(db: AsyncSession, user_id: int, key: str, fingerprint: str, ttl: int) -> IdempotencyKey:
+    """
+    Insert the key row and flush it; raises IntegrityError if a concurrent request holds the key.
+    Set `.response` on the returned row before committing.
+    """
+    row = IdempotencyKey(user_id=user_id, key=key, request_hash=fingerprint,
+                         expires_at=datetime.utcnow() + timedelta(seconds=ttl))
+    db.add(row)
+    await db.flush()
+    return row
@@ -0,0 +1,122 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from app.core.config import settings
+from app.core import metrics
+
+# Per-request performance accounting: SQL statement count and time (via engine
+# events), time spent in outbound calls, total latency. Reported as Server-Timing
+# headers and as /metrics histograms.
+
+logger = logging.getLogger(__name__)
+
+_request_stats = ContextVar("request_stats", default=None)
+
+http_latency = metrics.Histogram("http_request_seconds", "Request latency", labels=("method", "route", "status"))
+http_db_queries = metrics.Histogram(
+    "http_request_db_queries", "SQL statements per request", labels=("route",),
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250),
+)
+http_db_seconds = metrics.Histogram("http_request_db_seconds", "Cumulative SQL time per request", labels=("route",))
+external_seconds = metrics.Histogram("external_call_seconds", "Outbound call latency", labels=("target",))
+db_query_seconds = metrics.Histogram("db_query_seconds", "SQL statement latency")
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_time", "external")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.external = {}
+
+
+def current_stats():
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    db_query_seconds.observe(elapsed)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_time += elapsed
+
+
+def instrument_engine(engine):
+    """
+    Attach the SQL timing hooks to a (sync) Engine; pass AsyncEngine.sync_engine for async ones.
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_external(target: str):
+    """
+    Time an outbound call (pricing webhook, SendGrid, ...) against the current request.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        external_seconds.observe(elapsed, target=target)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.external[target] = stats.external.get(target, 0.0) + elapsed
+
+
+def _server_timing(stats: RequestStats, total: float) -> str:
+    parts = [f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.sql_count} queries"']
+    for target, elapsed in stats.external.items():
+        parts.append(f"{target};dur={elapsed * 1000:.1f}")
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - start).encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+            http_latency.observe(elapsed, method=scope["method"], route=route_path, status=status_code)
+            http_db_queries.observe(stats.sql_count, route=route_path)
+            http_db_seconds.observe(stats.sql_time, route=route_path)
+            if stats.sql_count > settings.query_count_warning_threshold:
+                logger.warning(
+                    "Possible N+1: %s %s ran %d SQL statements (%.1f ms)",
+                    scope["method"], route_path, stats.sql_count, stats.sql_time * 1000,
+                )
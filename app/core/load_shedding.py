@@ -0,0 +1,104 @@
+import asyncio
+import time
+from starlette.responses import JSONResponse
+from .config import settings
+from . import metrics
+
+# Per-route-group admission control. Each pool admits up to max_in_flight requests and
+# queues up to max_queue more for at most queue_timeout seconds; anything beyond that is
+# answered with 503 + Retry-After before it reaches a route (and takes a DB session).
+# On top, non-priority pools may only fill load_shed_max_in_flight - load_shed_reserved
+# slots in total, so a saturated expensive route can't starve the cheap auth routes.
+
+shed_in_flight = metrics.Gauge("load_shed_in_flight", "Requests admitted per pool", labels=("pool",))
+shed_queued = metrics.Gauge("load_shed_queued", "Requests waiting for a slot per pool", labels=("pool",))
+shed_rejected = metrics.Counter("load_shed_rejected_total", "Requests shed with 503", labels=("pool", "reason"))
+shed_wait = metrics.Histogram(
+    "load_shed_queue_wait_seconds", "Time admitted requests waited for a slot", labels=("pool",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+class _Pool:
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float, priority: bool):
+        self.name = name
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.priority = priority
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.waiting = 0
+
+    async def acquire(self):
+        """
+        Returns None once a slot is held, or the reason the request was shed.
+        """
+        if not self.semaphore.locked():
+            await self.semaphore.acquire()
+            return None
+        if self.waiting >= self.max_queue:
+            return "queue_full"
+        self.waiting += 1
+        shed_queued.set(self.waiting, pool=self.name)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        finally:
+            self.waiting -= 1
+            shed_queued.set(self.waiting, pool=self.name)
+        shed_wait.observe(time.perf_counter() - start, pool=self.name)
+        return None
+
+
+class LoadSheddingMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.pools = [
+            (pool_name, config.prefixes, _Pool(pool_name, config.max_in_flight, config.max_queue, config.queue_timeout, config.priority))
+            for pool_name, config in settings.load_shed_pools.items()
+        ]
+        self.default = next((pool for name, _, pool in self.pools if name == "default"), None)
+        self.in_flight = 0
+
+    def _pool_for(self, path: str):
+        if path.startswith(tuple(settings.load_shed_exempt_prefixes)):
+            return None
+        for _, prefixes, pool in self.pools:
+            if prefixes and path.startswith(tuple(prefixes)):
+                return pool
+        return self.default
+
+    async def _shed(self, scope, receive, send, pool: _Pool, reason: str):
+        shed_rejected.inc(pool=pool.name, reason=reason)
+        response = JSONResponse(
+            {"detail": "Server is busy, please retry shortly"},
+            status_code=503,
+            headers={"Retry-After": str(settings.load_shed_retry_after)},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        pool = self._pool_for(scope["path"]) if scope["type"] == "http" and settings.load_shed_enabled else None
+        if pool is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await pool.acquire()
+        if reason:
+            await self._shed(scope, receive, send, pool, reason)
+            return
+        limit = settings.load_shed_max_in_flight - (0 if pool.priority else settings.load_shed_reserved)
+        if self.in_flight >= limit:
+            pool.semaphore.release()
+            await self._shed(scope, receive, send, pool, "global" if pool.priority else "reserved")
+            return
+
+        self.in_flight += 1
+        shed_in_flight.inc(pool=pool.name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            shed_in_flight.dec(pool=pool.name)
+            pool.semaphore.release()
@@ -0,0 +1,131 @@
+import threading
+
+# Minimal Prometheus text-format registry, so we don't pull in a client library
+# for a handful of counters and histograms.
+
+_registry = []
+_collectors = []
+_lock = threading.Lock()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labels)
+        self._values = {}
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            items = [(key, dict(state, counts=list(state["counts"]))) for key, state in self._values.items()]
+        for key, state in items:
+            for bound, count in zip(self.buckets, state["counts"]):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+        return lines
+
+
+def register_collector(collector):
+    """
+    Register a callable returning {metric_name: value} gauges that are read at scrape time,
+    for state that already lives elsewhere (cache sizes, pool occupancy, ...).
+    Names may carry a label set, e.g. 'db_pool_checked_out{engine="primary"}'.
+    """
+    with _lock:
+        _collectors.append(collector)
+
+
+def render_latest() -> str:
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    # Samples of one metric family have to be contiguous in the exposition format
+    families = {}
+    for collector in list(_collectors):
+        for name, value in collector().items():
+            families.setdefault(name.split("{", 1)[0], []).append(f"{name} {value}")
+    for base_name, samples in families.items():
+        lines.append(f"# TYPE {base_name} gauge")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,89 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+import httpx
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.instrumentation import track_external
+from app.models.outbox import EmailOutbox
+
+# Drains the email_outbox table in batches over one pooled HTTP client.
+# Rows are claimed with SKIP LOCKED, so every worker process can run a drainer.
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(settings.email_outbox_backoff_base * 2 ** (attempts - 1), settings.email_outbox_backoff_max)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def _payload(message: EmailOutbox) -> dict:
+    return {
+        "personalizations": [{"to": [{"email": message.to_email}]}],
+        "from": {"email": settings.registered_from_mail},
+        "subject": message.subject,
+        "content": [{"type": "text/plain", "value": message.content}],
+    }
+
+
+def create_sendgrid_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=settings.sendgrid_api_url,
+        headers={"Authorization": f"Bearer {settings.twillio_sendgrid_api_key}"},
+        timeout=settings.email_outbox_timeout,
+    )
+
+
+async def _send(client: httpx.AsyncClient, message: EmailOutbox):
+    with track_external("sendgrid"):
+        response = await client.post("/v3/mail/send", json=_payload(message))
+    response.raise_for_status()
+
+
+async def drain_once(client: httpx.AsyncClient) -> int:
+    """
+    Send one batch of due messages. Returns the number of rows processed.
+    """
+    async with AsyncSessionLocal() as db:
+        messages = (await db.execute(
+            select(EmailOutbox)
+            .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= datetime.utcnow())
+            .order_by(EmailOutbox.id)
+            .limit(settings.email_outbox_batch_size)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        if not messages:
+            return 0
+
+        results = await asyncio.gather(*(_send(client, m) for m in messages), return_exceptions=True)
+        now = datetime.utcnow()
+        for message, error in zip(messages, results):
+            message.attempts = (message.attempts or 0) + 1
+            if error is None:
+                message.status = "sent"
+                message.sent_at = now
+                message.last_error = None
+            else:
+                print(f"Error sending email {message.id} to {message.to_email}: {error}")
+                message.last_error = str(error)
+                if message.attempts >= settings.email_outbox_max_attempts:
+                    message.status = "failed"
+                else:
+                    message.next_attempt_at = now + _backoff(message.attempts)
+        await db.commit()
+        return len(messages)
+
+
+async def run_outbox_worker(stop: asyncio.Event):
+    async with create_sendgrid_client() as client:
+        while not stop.is_set():
+            try:
+                processed = await drain_once(client)
+            except Exception as e:
+                print(f"Error draining email outbox: {e}")
+                processed = 0
+            if processed < settings.email_outbox_batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=settings.email_outbox_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
@@ -0,0 +1,18 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+
+# Opaque keyset cursors: the (created_at, id) of the last row on a page, base64-encoded.
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
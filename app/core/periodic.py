@@ -0,0 +1,41 @@
+import asyncio
+from datetime import timedelta
+from app.core.db import AsyncSessionLocal
+
+# Worker loop shared by the per-worker mirrors of cross-worker state (revoked sessions,
+# role changes): each pass reads what other workers committed since the last one, and
+# now and then deletes rows nobody needs to read any more.
+
+# Re-read this much history on every sync, for rows that committed late
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def sync_since(synced_until, horizon):
+    """
+    Where the next sync starts reading: a little before the last one ended, but never
+    before `horizon` (anything older no longer matters).
+    """
+    return max(synced_until - SYNC_OVERLAP, horizon) if synced_until else horizon
+
+
+async def run_periodic_sync(stop: asyncio.Event, label: str, sync, interval, cleanup=None, cleanup_interval=lambda: 0):
+    """
+    Await sync(db) every interval() seconds until `stop` is set, and cleanup(db) on the
+    same session every cleanup_interval() seconds (0 disables it). The intervals are
+    callables so settings are re-read on every pass.
+    """
+    loop = asyncio.get_running_loop()
+    next_cleanup = loop.time() + cleanup_interval()
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                await sync(db)
+                if cleanup and cleanup_interval() > 0 and loop.time() >= next_cleanup:
+                    next_cleanup = loop.time() + cleanup_interval()
+                    await cleanup(db)
+        except Exception as e:
+            print(f"Error {label}: {e}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval())
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta
+from app.core.cache import LazyTTLCache
+from app.core.config import settings
+from app.core import metrics
+from app.core.db import AsyncSessionLocal
+from app.core.pricing_client import pricing_client, PricingError, PricingUnavailable
+from app.core.pricing_engine import get_pricing_engine, UnknownActivity
+from app.models.pricing import PricingQuote
+
+# Pricing results only depend on the cart contents and the two factors,
+# so repeat quotes are served from a TTL/LRU cache (optionally backed by pricing_quotes).
+
+pricing_cache = LazyTTLCache(lambda: settings.pricing_cache_size, lambda: settings.pricing_cache_ttl)
+metrics.register_collector(lambda: {
+    f"pricing_cache_{key}": value for key, value in pricing_cache.stats().items()
+})
+
+
+def pricing_cache_key(cart_items, direct_factor: float, indirect_factor: float) -> str:
+    items = sorted(
+        (str(item["uuid"]), item.get("activity_name") or "", int(item["quantity"]))
+        for item in cart_items
+    )
+    canonical = json.dumps(
+        {"items": items, "direct_factor": float(direct_factor), "indirect_factor": float(indirect_factor)},
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+# The persisted cache uses its own short-lived sessions so concurrent quotes
+# (see the bulk pricing endpoint) never share one AsyncSession.
+
+async def _load_persisted(key: str):
+    async with AsyncSessionLocal() as db:
+        quote = await db.get(PricingQuote, key)
+        if quote and quote.created_at > datetime.utcnow() - timedelta(seconds=settings.pricing_cache_ttl):
+            return quote.result
+    return None
+
+
+async def _persist(key: str, result: dict):
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.merge(PricingQuote(cache_key=key, result=result, created_at=datetime.utcnow()))
+            await db.commit()
+        except Exception as e:
+            # Another request stored the same quote first; the in-memory copy is enough
+            print(f"Error persisting pricing quote: {e}")
+            await db.rollback()
+
+
+async def get_cart_price(cart_items, direct_factor: float, indirect_factor: float) -> dict:
+    """
+    Return the pricing service result ({"final": ..., "components": [...]}) for a cart,
+    serving repeat quotes from the cache.
+    """
+    if settings.pricing_backend == "local":
+        # Computed in-process, cheaper than hashing the cart for a cache lookup
+        return get_pricing_engine().price(cart_items, direct_factor, indirect_factor)
+
+    key = pricing_cache_key(cart_items, direct_factor, indirect_factor)
+    result = pricing_cache.get(key)
+    if result is not None:
+        return result
+
+    if settings.pricing_cache_persist:
+        result = await _load_persisted(key)
+        if result is not None:
+            pricing_cache.set(key, result)
+            return result
+
+    result = await pricing_client.quote(cart_items, direct_factor, indirect_factor)
+    pricing_cache.set(key, result)
+    if settings.pricing_cache_persist:
+        await _persist(key, result)
+    return result
+
+
+async def price_many(carts: dict, direct_factor: float, indirect_factor: float, concurrency: int = None):
+    """
+    Price {cart_submission_id: cart_items} in one pass. Identical carts are priced once,
+    and at most `concurrency` quotes are in flight. Yields (ids, result, error) as each
+    distinct cart finishes.
+    """
+    groups = {}
+    for cart_id, cart_items in carts.items():
+        key = pricing_cache_key(cart_items, direct_factor, indirect_factor)
+        groups.setdefault(key, ([], cart_items))[0].append(cart_id)
+
+    if settings.pricing_backend == "local":
+        grouped = list(groups.values())
+        results = get_pricing_engine().price_many([cart_items for _, cart_items in grouped], direct_factor, indirect_factor)
+        for (ids, _), result in zip(grouped, results):
+            if isinstance(result, Exception):
+                yield ids, None, result
+            else:
+                yield ids, result, None
+        return
+
+    semaphore = asyncio.Semaphore(concurrency or settings.pricing_bulk_concurrency)
+
+    async def _price(ids, cart_items):
+        async with semaphore:
+            try:
+                return ids, await get_cart_price(cart_items, direct_factor, indirect_factor), None
+            except Exception as e:
+                return ids, None, e
+
+    tasks = [asyncio.create_task(_price(ids, cart_items)) for ids, cart_items in groups.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,152 @@
+import asyncio
+import random
+import time
+import httpx
+from app.core.config import settings
+from app.core import metrics
+from app.core.instrumentation import track_external
+
+# Shared, connection-pooled client for the external pricing webhook.
+# Owned by the app lifespan; every call has a timeout, bounded jittered retries,
+# and a circuit breaker so a dead pricing service fails fast instead of piling up.
+
+pricing_calls = metrics.Counter("pricing_webhook_calls_total", "Pricing webhook calls by outcome", labels=("outcome",))
+pricing_latency = metrics.Histogram("pricing_webhook_seconds", "Pricing webhook call latency, including retries")
+pricing_circuit_open = metrics.Gauge("pricing_circuit_open", "1 while the pricing circuit breaker is open")
+
+
+class PricingError(Exception):
+    pass
+
+
+class PricingUnavailable(PricingError):
+    """Raised without calling the service while the circuit breaker is open."""
+
+
+class _RetryableStatus(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+        # half-open: admit a single trial call and short-circuit everyone else until it
+        # reports back. A trial that never does (e.g. cancelled) is replaced after reset_timeout.
+        now = time.monotonic()
+        if self.trial_started_at is not None and now - self.trial_started_at < self.reset_timeout:
+            return False
+        self.trial_started_at = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        pricing_circuit_open.set(0)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self.trial_started_at = None
+            pricing_circuit_open.set(1)
+
+
+class PricingClient:
+    def __init__(self):
+        self._client = None
+        self._breaker = None
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        if self._breaker is None:
+            self._breaker = CircuitBreaker(settings.pricing_circuit_failure_threshold, settings.pricing_circuit_reset_timeout)
+        return self._breaker
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.pricing_timeout),
+                limits=httpx.Limits(
+                    max_connections=settings.pricing_max_connections,
+                    max_keepalive_connections=settings.pricing_max_connections,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def start(self):
+        self._get_client()
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, settings.pricing_retry_backoff * 2 ** attempt)
+
+    async def _post(self, cart_items, direct_factor: float, indirect_factor: float) -> dict:
+        with track_external("pricing"):
+            response = await self._get_client().post(
+                settings.pricing_webhook_url,
+                params={"direct_factor": direct_factor, "indirect_factor": indirect_factor},
+                json=cart_items,
+            )
+        if response.status_code >= 500 or response.status_code == 429:
+            raise _RetryableStatus(f"Pricing service returned {response.status_code}")
+        if response.status_code != 200:
+            raise PricingError(f"Pricing service returned {response.status_code}")
+        return response.json()
+
+    async def quote(self, cart_items, direct_factor: float, indirect_factor: float) -> dict:
+        if not self.breaker.allow():
+            pricing_calls.inc(outcome="short_circuited")
+            raise PricingUnavailable("Pricing service is unavailable")
+
+        start = time.perf_counter()
+        try:
+            for attempt in range(settings.pricing_max_retries + 1):
+                try:
+                    data = await self._post(cart_items, direct_factor, indirect_factor)
+                    self.breaker.record_success()
+                    pricing_calls.inc(outcome="ok")
+                    return data
+                except (httpx.TransportError, _RetryableStatus) as e:
+                    error = e
+                    if attempt < settings.pricing_max_retries:
+                        pricing_calls.inc(outcome="retry")
+                        await asyncio.sleep(self._backoff(attempt))
+                except PricingError:
+                    # The service answered; a 4xx is a bad request, not an outage
+                    self.breaker.record_success()
+                    pricing_calls.inc(outcome="rejected")
+                    raise
+            self.breaker.record_failure()
+            pricing_calls.inc(outcome="failed")
+            raise PricingError(f"Pricing service failed: {error}")
+        finally:
+            pricing_latency.observe(time.perf_counter() - start)
+
+
+pricing_client = PricingClient()
@@ -0,0 +1,100 @@
+import csv
+import numpy as np
+from app.core.config import settings
+from app.core.pricing_client import PricingError
+
+# In-process alternative to the pricing webhook (PRICING_BACKEND=local).
+# Per-activity unit costs are loaded once from a CSV cost table with the columns
+#   uuid, activity_name, direct_cost, indirect_cost
+# and each line item is priced as
+#   direct   = quantity * direct_cost   * direct_factor
+#   indirect = quantity * indirect_cost * indirect_factor
+# with the cart's final price being the sum over its items.
+
+
+class UnknownActivity(PricingError):
+    """The cart references an activity that has no row in the cost table."""
+
+    def __init__(self, activity_uuid):
+        super().__init__(f"No cost entry for activity {activity_uuid}")
+        self.activity_uuid = str(activity_uuid)
+
+
+class LocalPricingEngine:
+    def __init__(self, cost_table_path: str):
+        self._index = {}
+        names, direct, indirect = [], [], []
+        with open(cost_table_path, newline="") as f:
+            for row in csv.DictReader(f):
+                self._index[row["uuid"].strip().lower()] = len(names)
+                names.append(row.get("activity_name", ""))
+                direct.append(float(row["direct_cost"]))
+                indirect.append(float(row["indirect_cost"]))
+        self._names = names
+        self._direct = np.asarray(direct, dtype=np.float64)
+        self._indirect = np.asarray(indirect, dtype=np.float64)
+
+    def price(self, cart_items, direct_factor: float, indirect_factor: float) -> dict:
+        result = self.price_many([cart_items], direct_factor, indirect_factor)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def price_many(self, carts, direct_factor: float, indirect_factor: float) -> list:
+        """
+        Price a list of carts in one vectorized pass. Returns one result dict per cart,
+        or an UnknownActivity error in its place when the cart references an unknown activity.
+        """
+        results = [None] * len(carts)
+        cart_idx, activity_idx, quantities, items = [], [], [], []
+        for position, cart_items in enumerate(carts):
+            rows = []
+            for item in cart_items:
+                index = self._index.get(str(item["uuid"]).lower())
+                if index is None:
+                    results[position] = UnknownActivity(item["uuid"])
+                    break
+                rows.append((index, item))
+            else:
+                for index, item in rows:
+                    cart_idx.append(position)
+                    activity_idx.append(index)
+                    quantities.append(item["quantity"])
+                    items.append(item)
+
+        if items:
+            cart_idx = np.asarray(cart_idx, dtype=np.intp)
+            activity_idx = np.asarray(activity_idx, dtype=np.intp)
+            quantities = np.asarray(quantities, dtype=np.float64)
+            direct = quantities * self._direct[activity_idx] * direct_factor
+            indirect = quantities * self._indirect[activity_idx] * indirect_factor
+            totals = direct + indirect
+            finals = np.bincount(cart_idx, weights=totals, minlength=len(carts))
+        else:
+            finals = np.zeros(len(carts))
+
+        components = [[] for _ in carts]
+        for n, item in enumerate(items):
+            components[cart_idx[n]].append({
+                "uuid": str(item["uuid"]),
+                "activity_name": item.get("activity_name") or self._names[activity_idx[n]],
+                "quantity": item["quantity"],
+                "direct": float(direct[n]),
+                "indirect": float(indirect[n]),
+                "total": float(totals[n]),
+            })
+
+        for position in range(len(carts)):
+            if results[position] is None:
+                results[position] = {"final": float(finals[position]), "components": components[position]}
+        return results
+
+
+_engine = None
+
+
+def get_pricing_engine() -> LocalPricingEngine:
+    global _engine
+    if _engine is None:
+        _engine = LocalPricingEngine(settings.pricing_cost_table_path)
+    return _engine
@@ -0,0 +1,181 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth_utils import ACCESS_TOKEN_TTL, REFRESH_TOKEN_TTL
+from app.core.config import settings
+from app.core import metrics
+from app.core.periodic import run_periodic_sync, sync_since
+from app.models.session import UserSession
+from app.models.user import User
+
+# Refresh-token sessions (user_sessions). Access tokens carry the session id as "sid";
+# revoked sids are mirrored into an in-memory map so get_current_user can reject them
+# without a DB read. Each worker syncs the map from revoked_at every few seconds, and
+# entries are dropped once every access token they could cover has expired.
+
+_revoked = {}  # session id -> revoked_at
+_synced_until = None
+
+metrics.register_collector(lambda: {"session_revocations_cached": len(_revoked)})
+
+
+def hash_jti(jti: str) -> str:
+    return hashlib.sha256(jti.encode()).hexdigest()
+
+
+def new_jti() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def _next_jti(jti: str) -> str:
+    # Rotation derives the replacement from the jti it replaces (keyed, so it can't be
+    # guessed from a token), which lets a retried refresh be recognised without storing
+    # the previous jti
+    digest = hmac.new(settings.jwt_secret_key.encode(), jti.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:24]).decode()
+
+
+def is_revoked(session_id) -> bool:
+    return session_id in _revoked
+
+
+def _mark_revoked(session_ids, revoked_at: datetime):
+    for session_id in session_ids:
+        _revoked[session_id] = revoked_at
+
+
+async def open_session(db: AsyncSession, user_id: int, device: str = None):
+    """
+    Add a session row for a fresh login; returns (session, jti) for the refresh token.
+    """
+    jti = new_jti()
+    session = UserSession(
+        user_id=user_id,
+        jti_hash=hash_jti(jti),
+        device=device[:255] if device else None,
+        expires_at=datetime.utcnow() + REFRESH_TOKEN_TTL,
+    )
+    db.add(session)
+    await db.flush()
+    return session, jti
+
+
+async def rotate_session(db: AsyncSession, session_id: int, jti: str):
+    """
+    Swap the session's current jti for a new one and extend its expiry, in one
+    UPDATE by primary key that also returns what the new tokens need.
+    Returns (user row, new jti), or None if the token is not the session's current one.
+
+    A token that was rotated less than session_refresh_grace seconds ago gets the
+    current jti back instead, so a client whose two refreshes raced (two tabs, or a
+    retry after a lost response) keeps its session.
+    """
+    now = datetime.utcnow()
+    replacement = _next_jti(jti)
+    # Correlated subqueries rather than UPDATE ... FROM users: SQLite can't return columns of a FROM table
+    user_column = lambda column: select(column).where(User.id == UserSession.user_id).scalar_subquery().label(column.key)
+    user = (await db.execute(
+        update(UserSession)
+        .where(
+            UserSession.id == session_id,
+            UserSession.jti_hash == hash_jti(jti),
+            UserSession.revoked_at.is_(None),
+            UserSession.expires_at > now,
+        )
+        .values(jti_hash=hash_jti(replacement), last_used_at=now, expires_at=now + REFRESH_TOKEN_TTL)
+        .returning(user_column(User.username), user_column(User.role), user_column(User.name))
+        .execution_options(synchronize_session=False)
+    )).first()
+    if user:
+        return user, replacement
+
+    if settings.session_refresh_grace > 0:
+        user = (await db.execute(
+            select(User.username, User.role, User.name)
+            .join(UserSession, UserSession.user_id == User.id)
+            .where(
+                UserSession.id == session_id,
+                UserSession.jti_hash == hash_jti(replacement),
+                UserSession.revoked_at.is_(None),
+                UserSession.expires_at > now,
+                UserSession.last_used_at >= now - timedelta(seconds=settings.session_refresh_grace),
+            )
+        )).first()
+        if user:
+            return user, replacement
+
+    # A correctly signed token that is no longer current has been used before: assume it
+    # leaked and end the session, so whoever holds the newer token has to log in again
+    reused = (await db.execute(
+        update(UserSession)
+        .where(UserSession.id == session_id, UserSession.revoked_at.is_(None))
+        .values(revoked_at=now)
+        .returning(UserSession.id)
+        .execution_options(synchronize_session=False)
+    )).scalars().all()
+    _mark_revoked(reused, now)
+    return None
+
+
+async def revoke_sessions(db: AsyncSession, user_id: int, session_id: int = None) -> int:
+    """
+    Revoke one of the user's sessions, or all of them when session_id is None.
+    The caller commits.
+    """
+    now = datetime.utcnow()
+    query = update(UserSession).where(UserSession.user_id == user_id, UserSession.revoked_at.is_(None))
+    if session_id is not None:
+        query = query.where(UserSession.id == session_id)
+    revoked = (await db.execute(
+        query.values(revoked_at=now).returning(UserSession.id).execution_options(synchronize_session=False)
+    )).scalars().all()
+    _mark_revoked(revoked, now)
+    return len(revoked)
+
+
+async def sync_revocations(db: AsyncSession):
+    global _synced_until
+    now = datetime.utcnow()
+    horizon = now - ACCESS_TOKEN_TTL
+    since = sync_since(_synced_until, horizon)
+    rows = (await db.execute(
+        select(UserSession.id, UserSession.revoked_at).where(UserSession.revoked_at >= since)
+    )).all()
+    for session_id, revoked_at in rows:
+        _revoked[session_id] = revoked_at
+    for session_id, revoked_at in list(_revoked.items()):
+        if revoked_at < horizon:
+            del _revoked[session_id]
+    _synced_until = now
+
+
+async def sweep_sessions(db: AsyncSession, batch_size: int) -> int:
+    """
+    Delete expired sessions, and revoked ones older than the access-token lifetime,
+    one committed batch at a time.
+    """
+    now = datetime.utcnow()
+    removable = or_(UserSession.expires_at < now, UserSession.revoked_at < now - ACCESS_TOKEN_TTL)
+    swept = 0
+    while True:
+        batch = select(UserSession.id).where(removable).limit(batch_size)
+        deleted = (await db.execute(
+            delete(UserSession).where(UserSession.id.in_(batch)).execution_options(synchronize_session=False)
+        )).rowcount
+        await db.commit()
+        swept += deleted
+        if deleted < batch_size:
+            return swept
+
+
+async def run_session_maintenance(stop: asyncio.Event):
+    await run_periodic_sync(
+        stop, "maintaining sessions", sync_revocations, lambda: settings.session_revocation_sync_interval,
+        cleanup=lambda db: sweep_sessions(db, settings.session_sweep_batch_size),
+        cleanup_interval=lambda: settings.session_sweep_interval,
+    )
@@ -0,0 +1,78 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from sqlalchemy import select
+from app.core.db import dialect_insert
+from app.models.versions import ResourceVersion
+
+# Conditional GET for the admin polling endpoints. Writers execute bump_version()
+# inside their transaction; readers look up the counter (one primary-key read) before
+# running the list query and answer 304 when the client already has that version.
+
+CART_SUBMISSIONS = "cart_submissions"
+ROLE_REQUESTS = "role_requests"
+
+
+def bump_version(db, resource: str):
+    """
+    Statement incrementing `resource`'s version; execute it with the session's
+    execute() (awaited for AsyncSession) just before committing, so the row lock
+    is held briefly.
+    """
+    insert = dialect_insert(db)
+    now = datetime.utcnow()
+    stmt = insert(ResourceVersion).values(name=resource, version=1, updated_at=now)
+    return stmt.on_conflict_do_update(
+        index_elements=[ResourceVersion.name],
+        set_={"version": ResourceVersion.version + 1, "updated_at": now},
+    )
+
+
+def version_query(resource: str):
+    return select(ResourceVersion.version, ResourceVersion.updated_at).where(ResourceVersion.name == resource)
+
+
+def _etag(resource: str, version: int, request: Request) -> str:
+    # The same version renders differently per query (filters, cursor, limit)
+    query = hashlib.sha256(str(request.query_params).encode()).hexdigest()[:16]
+    return f'W/"{resource}-{version}-{query}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: W/ prefixes are ignored
+    return "*" in candidates or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+
+def conditional_response(request: Request, response: Response, resource: str, row):
+    """
+    Set ETag/Last-Modified on `response` from the version `row` (result of version_query)
+    and return a 304 response if the client's copy is current, else None.
+    """
+    version, updated_at = row if row else (0, None)
+    headers = {"ETag": _etag(resource, version, request), "Cache-Control": "private, no-cache"}
+    if updated_at:
+        # HTTP dates have whole seconds. Once updated_at's second is over, advertise the
+        # end of it: any later write is newer than that, so the strict comparison below
+        # catches it. Until then the start of the second is all we can send without a
+        # future date, and it never validates (updated_at is not older than it).
+        last_modified = updated_at.replace(microsecond=0)
+        if last_modified + timedelta(seconds=1) <= datetime.utcnow():
+            last_modified += timedelta(seconds=1)
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    response.headers.update(headers)
+
+    # If-None-Match takes precedence; If-Modified-Since is ignored when both are sent (RFC 9110)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, headers["ETag"])
+    elif updated_at and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            not_modified = updated_at < since.astimezone(timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            not_modified = False
+    else:
+        not_modified = False
+    return Response(status_code=304, headers=headers) if not_modified else None
@@ -1,14 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.core.db import Base, engine
-from app.api import auth,product
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.api import auth,product,analytics,events
 from app.core.config import settings
+from app.core import hash_pool, metrics
+from app.core.outbox_worker import run_outbox_worker
+from app.core.analytics import run_analytics_refresher
+from app.core.events import broker, run_event_bridge
+from app.core.sessions import run_session_maintenance
+from app.core.dependencies import run_principal_sync
+from app.core.pricing_client import pricing_client
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.compression import CompressionMiddleware
+from app.core.load_shedding import LoadSheddingMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import uvicorn
 
-Base.metadata.create_all(bind=engine)
+# Schema creation lives in `python -m app.bootstrap`; importing the app touches no database,
+# so it is safe to preload before forking workers.
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.db_bootstrap_on_startup:
+        from app.bootstrap import create_schema
+        await run_in_threadpool(create_schema)
+    await pricing_client.start()
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(run_session_maintenance(stop)), asyncio.create_task(run_principal_sync(stop))]
+    if settings.email_outbox_worker_enabled:
+        tasks.append(asyncio.create_task(run_outbox_worker(stop)))
+    if settings.analytics_refresh_interval > 0:
+        tasks.append(asyncio.create_task(run_analytics_refresher(stop)))
+    if settings.events_pg_bridge:
+        tasks.append(asyncio.create_task(run_event_bridge(stop)))
+    yield
+    stop.set()
+    broker.close()
+    await asyncio.gather(*tasks)
+    await pricing_client.close()
+    hash_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "http://localhost:3000",
@@ -19,21 +54,32 @@ origins = [
     "*"
 ]
 
+# Innermost, so shed requests still get CORS headers and show up in the request metrics
+app.add_middleware(LoadSheddingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins, 
     allow_credentials=True,
     allow_methods=["*"],  
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "Idempotent-Replayed", "ETag", "Last-Modified"]
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(InstrumentationMiddleware)
 
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(product.router, prefix="/api/cart")
+app.include_router(analytics.router, prefix="/api/analytics")
+app.include_router(events.router, prefix="/api/events")
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Jigyasu Backend."}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_latest(), media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.core.db import Base
+from datetime import datetime
+
+# Demand rollups maintained by app.core.analytics: bumped in the same transaction
+# as submit_cart / quote_price and rebuilt from cart_items by a periodic refresh.
+
+class ActivityDemand(Base):
+    __tablename__ = "activity_demand"
+
+    activity_uuid = Column(String(36), primary_key=True)
+    activity_name = Column(String, nullable=False)
+    cart_count = Column(Integer, nullable=False, default=0, index=True)
+    total_quantity = Column(Integer, nullable=False, default=0)
+    pending_count = Column(Integer, nullable=False, default=0)
+    replied_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ActivityDemand(activity_uuid={self.activity_uuid}, cart_count={self.cart_count})>"
+
+class OrgDemand(Base):
+    __tablename__ = "org_demand"
+
+    # Users without an organisation are rolled up under ""
+    org_name = Column(String, primary_key=True)
+    cart_count = Column(Integer, nullable=False, default=0, index=True)
+    total_quantity = Column(Integer, nullable=False, default=0)
+    pending_count = Column(Integer, nullable=False, default=0)
+    replied_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<OrgDemand(org_name={self.org_name}, cart_count={self.cart_count})>"
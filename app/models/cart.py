@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, JSON, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, JSON, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.core.db import Base
 from datetime import datetime 
@@ -17,5 +17,34 @@ class CartSubmission(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     cart_items = Column(JSON, default=list)
     user = relationship("User", back_populates="cart_submissions")
+    line_items = relationship("CartLineItem", back_populates="submission", passive_deletes=True)
+
+    # Keyset pagination over (created_at, id), optionally narrowed by status
+    __table_args__ = (
+        Index("ix_cart_submissions_created_at_id", "created_at", "id"),
+        Index("ix_cart_submissions_status_created_at_id", "status", "created_at", "id"),
+    )
+
+    def __repr__(self):
+        return f"<CartSubmission(user_id={self.user_id}, status={self.status})>"
+
+class CartLineItem(Base):
+    """
+    One row per cart line, written alongside CartSubmission.cart_items so per-activity
+    filtering and aggregation can run in SQL instead of over the JSON blob.
+    """
+    __tablename__ = "cart_items"
+
+    id = Column(Integer, primary_key=True)
+    submission_id = Column(Integer, ForeignKey("cart_submissions.id", ondelete="CASCADE"), nullable=False, index=True)
+    activity_uuid = Column(String(36), nullable=False)
+    activity_name = Column(String, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    submission = relationship("CartSubmission", back_populates="line_items")
+
+    __table_args__ = (
+        Index("ix_cart_items_activity_uuid_submission_id", "activity_uuid", "submission_id"),
+    )
+
     def __repr__(self):
-        return f"<CartSubmission(user_id={self.user_id}, status={self.status})>"
\ No newline at end of file
+        return f"<CartLineItem(submission_id={self.submission_id}, activity_uuid={self.activity_uuid}, quantity={self.quantity})>"
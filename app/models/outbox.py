@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.core.db import Base
+from datetime import datetime
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    status = Column(String, default="pending")  # pending -> sent | failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox(to_email={self.to_email}, status={self.status})>"
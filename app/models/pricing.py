@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, JSON, DateTime
+from app.core.db import Base
+from datetime import datetime
+
+class PricingQuote(Base):
+    __tablename__ = "pricing_quotes"
+
+    # sha256 of the canonical cart + factors, see app.core.pricing.pricing_cache_key
+    cache_key = Column(String(64), primary_key=True)
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<PricingQuote(cache_key={self.cache_key})>"
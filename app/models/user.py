@@ -1,6 +1,23 @@
-from sqlalchemy import Column, Integer, String,ForeignKey
+from sqlalchemy import Column, Integer, String,ForeignKey, Index, DateTime, func, literal_column
 from sqlalchemy.orm import relationship
 from app.core.db import Base
+from datetime import datetime
+
+# Separators users type in phone numbers; searches compare digits only. Plain nested
+# replace() rather than regexp_replace so the expression also runs on SQLite.
+PHONE_SEPARATORS = (" ", "-", "(", ")", "+", ".")
+
+
+def phone_digits(column):
+    """
+    The phone number with separators stripped, e.g. "+91 98765-43210" -> "919876543210".
+    Queries must use this same expression to hit ix_users_phone_digits_trgm.
+    """
+    # Literal SQL rather than bound parameters, so the query text matches the index expression
+    for separator in PHONE_SEPARATORS:
+        column = func.replace(column, literal_column(f"'{separator}'"), literal_column("''"))
+    return column
+
 
 class User(Base):
     __tablename__ = "users"
@@ -17,6 +34,15 @@ class User(Base):
     role_requests = relationship("RoleUpgradeRequestTable", back_populates="user")
     refresh_token = Column(String, nullable=True)
 
+    # Search indexes for /api/auth/role-requests/search: trigram GIN indexes serve the
+    # substring matches on name, email and the digits of the phone number.
+    __table_args__ = (
+        Index("ix_users_name_trgm", name, postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", email, postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_phone_digits_trgm", phone_digits(phone_number).label("phone_digits"),
+              postgresql_using="gin", postgresql_ops={"phone_digits": "gin_trgm_ops"}),
+    )
+
     def __repr__(self):
         return f"<User(username={self.username}, role={self.role})>"
 
@@ -24,8 +50,24 @@ class RoleUpgradeRequestTable(Base):
     __tablename__ = "role_upgrade_requests"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     requested_role = Column(String, nullable=False)  # Use String instead of Enum
     internal_role = Column(String, nullable=True)  # Internal role as string
     status = Column(String, default="pending")
     user = relationship("User", back_populates="role_requests")
+
+    # Keyset pagination of the admin queue by status
+    __table_args__ = (
+        Index("ix_role_upgrade_requests_status_id", "status", "id"),
+    )
+
+class RoleChange(Base):
+    """
+    Written in the same transaction as a role change, so every worker can drop its
+    cached principal for the user (see app.core.dependencies.sync_role_changes).
+    """
+    __tablename__ = "role_changes"
+
+    id = Column(Integer, primary_key=True)
+    username = Column(String, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, BigInteger, String, DateTime
+from app.core.db import Base
+from datetime import datetime
+
+class ResourceVersion(Base):
+    """
+    Change counter per polled resource, bumped in the same transaction as every write
+    to it; drives ETag / Last-Modified on the admin list endpoints.
+    """
+    __tablename__ = "resource_versions"
+
+    name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ResourceVersion(name={self.name}, version={self.version})>"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 class UserCreate(BaseModel):
     username: str
     password: str
@@ -18,6 +18,10 @@ class UserCreate(BaseModel):
 
 class RoleUpgradeRequest(BaseModel):
     role: str 
+class BulkRoleRequestDecision(BaseModel):
+    request_ids: List[int]
+    approve: bool
+
 class UserLogin(BaseModel):
     email: str
     password: str
@@ -26,4 +30,30 @@ class APIKeyResponse(BaseModel):
     api_key: str
 
 class RefreshTokenRequest(BaseModel):
-    refresh_token: str
\ No newline at end of file
+    refresh_token: str
+
+class Principal(BaseModel):
+    # Detached snapshot of the authenticated user, safe to cache across requests
+    id: int
+    username: str
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    name: Optional[str] = None
+    org_name: Optional[str] = None
+    role: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+class RoleRequestUser(BaseModel):
+    username: Optional[str] = None
+    email: Optional[str] = None
+    name: Optional[str] = None
+    phone_number: Optional[str] = None
+
+class RoleRequestOut(BaseModel):
+    id: int
+    requested_role: Optional[str] = None
+    internal_role: Optional[str] = None
+    status: str
+    user_id: int
+    user: RoleRequestUser
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from uuid import UUID
+from datetime import datetime
 
 class CartItem(BaseModel):
     uuid: UUID
@@ -8,4 +9,29 @@ class CartItem(BaseModel):
     quantity: int
 
 class CartItemsRequest(BaseModel):
-    items: List[CartItem]
\ No newline at end of file
+    items: List[CartItem]
+
+# Response models for the admin list endpoints. Line items are plain strings here:
+# they were validated on the way in, and re-parsing UUIDs on every read is wasted work.
+
+class CartLineOut(BaseModel):
+    uuid: str
+    activity_name: str
+    quantity: int
+
+class CartSubmissionUser(BaseModel):
+    email: Optional[str] = None
+    name: Optional[str] = None
+    phone_number: Optional[str] = None
+    org_name: Optional[str] = None
+
+class CartSubmissionOut(BaseModel):
+    id: int
+    status: str
+    created_at: Optional[datetime] = None
+    user: CartSubmissionUser
+    cart_items: Optional[List[CartLineOut]] = None
+
+class CartSubmissionPage(BaseModel):
+    cart_submissions: List[CartSubmissionOut]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,58 @@
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors: int = 0, elapsed: float = None) -> dict:
+    """
+    Latency summary in milliseconds; throughput is requests per second of wall time.
+    """
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": count / elapsed if elapsed else 0.0,
+        "mean_ms": sum(values) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": values[-1] * 1000 if count else 0.0,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def write_results(path: str, suite: str, params: dict, results: dict):
+    """
+    Write a machine-readable result file; bench.compare diffs two of them.
+    """
+    document = {
+        "suite": suite,
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": params,
+        "results": results,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    print(f"results written to {path}")
@@ -0,0 +1,55 @@
+"""
+Compare two benchmark result files written by bench.load or bench.micro.
+
+    python -m bench.compare bench_results/base.json bench_results/head.json --threshold 10
+
+Exits non-zero when any tracked metric regressed by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+# metric -> True when higher is better
+TRACKED = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "median_us": False,
+    "encode_ms": False,
+    "bytes": False,
+    "seconds": False,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    print(f"base {base.get('commit')}  ->  head {head.get('commit')}")
+    regressions = 0
+    for name, head_metrics in head["results"].items():
+        base_metrics = base["results"].get(name)
+        if not base_metrics:
+            continue
+        for metric, higher_is_better in TRACKED.items():
+            if metric not in head_metrics or not base_metrics.get(metric):
+                continue
+            change = (head_metrics[metric] - base_metrics[metric]) / base_metrics[metric] * 100
+            regressed = change < -args.threshold if higher_is_better else change > args.threshold
+            regressions += regressed
+            marker = "REGRESSION" if regressed else ""
+            print(f"{name:50s} {metric:15s} {base_metrics[metric]:12.2f} -> {head_metrics[metric]:12.2f} ({change:+6.1f}%) {marker}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
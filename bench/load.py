@@ -0,0 +1,180 @@
+"""
+Route-level load test. Boots app.main:app against the database configured in the
+environment (PG_* variables, use a local throwaway database), a fake pricing webhook
+and a fake SendGrid, then drives each route at a fixed concurrency and reports
+throughput and p50/p95/p99 latency per route.
+
+    python -m bench.load --requests 500 --concurrency 32 --output bench_results/load.json
+
+Pass --base-url to benchmark an already running server instead (its pricing webhook
+and SendGrid settings are then up to you).
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+import httpx
+from bench.common import summarize, write_results
+from bench.stubs import StubServer, create_pricing_app, create_sendgrid_app
+
+
+def _start_app(port: int, workers: int, pricing_url: str, sendgrid_url: str, extra_env: dict = None):
+    env = dict(os.environ, PRICING_WEBHOOK_URL=pricing_url, SENDGRID_API_URL=sendgrid_url, **(extra_env or {}))
+    subprocess.run([sys.executable, "-m", "app.bootstrap"], env=env, check=True)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/").status_code == 200:
+                return process, base_url
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("app did not start within 60s")
+
+
+async def _drive(client, concurrency: int, requests):
+    """
+    Run (method, path, kwargs) requests with `concurrency` workers; returns (latencies, errors, elapsed, responses).
+    """
+    queue = asyncio.Queue()
+    for index, request in enumerate(requests):
+        queue.put_nowait((index, request))
+    latencies, responses = [], [None] * len(requests)
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                index, (method, path, kwargs) = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - start)
+                responses[index] = response
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                latencies.append(time.perf_counter() - start)
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start, responses
+
+
+def _promote_to_superuser(username: str):
+    from app.core.db import SessionLocal
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.username == username).update({"role": "superuser"})
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(base_url: str, total: int, concurrency: int) -> dict:
+    results = {}
+    run_id = uuid.uuid4().hex[:8]
+    run_digits = uuid.uuid4().int % 10 ** 6
+    cart = [{"uuid": str(uuid.uuid4()), "activity_name": f"activity-{i}", "quantity": i + 1} for i in range(5)]
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def phase(route: str, requests):
+            latencies, errors, elapsed, responses = await _drive(client, concurrency, requests)
+            results[route] = summarize(latencies, errors, elapsed)
+            print(f"{route:45s} {results[route]['throughput_rps']:9.1f} req/s  p50={results[route]['p50_ms']:.1f}ms  "
+                  f"p99={results[route]['p99_ms']:.1f}ms  errors={errors}")
+            return responses
+
+        # Admin routes run as a bench user promoted directly in the database,
+        # before it is ever cached as a principal
+        admin_user = {"username": f"bench-{run_id}-admin", "password": "bench-password", "email": f"bench-{run_id}-admin@example.com",
+                      "phone_number": f"+2{run_digits:06d}", "name": "Bench Admin"}
+        (await client.post("/api/auth/register", json=admin_user)).raise_for_status()
+        _promote_to_superuser(admin_user["username"])
+        admin = (await client.post("/api/auth/login", json={"email": admin_user["email"], "password": admin_user["password"]})).json()
+        admin_headers = {"Authorization": f"Bearer {admin['access_token']}"}
+
+        users = [
+            {"username": f"bench-{run_id}-{i}", "password": "bench-password", "email": f"bench-{run_id}-{i}@example.com",
+             "phone_number": f"+1{run_digits:06d}{i:06d}", "name": f"Bench User {i}"}
+            for i in range(total)
+        ]
+        await phase("POST /api/auth/register", [("POST", "/api/auth/register", {"json": user}) for user in users])
+
+        responses = await phase("POST /api/auth/login", [
+            ("POST", "/api/auth/login", {"json": {"email": user["email"], "password": user["password"]}}) for user in users
+        ])
+        tokens = [r.json() for r in responses if r is not None and r.status_code == 200]
+        if not tokens:
+            raise RuntimeError("no successful logins; is the database reachable?")
+
+        await phase("POST /api/auth/refresh", [
+            ("POST", "/api/auth/refresh", {"json": {"refresh_token": token["refresh_token"]}}) for token in tokens
+        ])
+        # /refresh rotated the refresh tokens; access tokens are still valid
+        auth_headers = [{"Authorization": f"Bearer {token['access_token']}"} for token in tokens]
+
+        await phase("POST /api/cart/submit-cart", [
+            ("POST", "/api/cart/submit-cart", {"json": cart, "headers": auth_headers[i % len(auth_headers)]}) for i in range(total)
+        ])
+
+        responses = await phase("GET /api/cart/cart-submissions", [
+            ("GET", "/api/cart/cart-submissions", {"params": {"include_items": "false"}, "headers": admin_headers}) for _ in range(total)
+        ])
+        submission_ids = [row["id"] for row in responses[0].json()["cart_submissions"]] if responses[0] is not None else []
+        if submission_ids:
+            await phase("GET /api/cart/calculate-price/{id}", [
+                ("GET", f"/api/cart/calculate-price/{submission_ids[i % len(submission_ids)]}",
+                 {"params": {"direct_factor": 1.5, "indirect_factor": 1.1 + (i % 7) / 10}, "headers": admin_headers})
+                for i in range(total)
+            ])
+
+        await phase("GET /api/auth/get-role", [("GET", "/api/auth/get-role", {"headers": admin_headers}) for _ in range(total)])
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the booted app")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--base-url", help="Benchmark an already running server instead of booting one")
+    parser.add_argument("--pricing-latency", type=float, default=0.02, help="Fake pricing webhook latency in seconds")
+    parser.add_argument("--pricing-failure-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="bench_results/load.json")
+    args = parser.parse_args()
+
+    params = vars(args)
+    if args.base_url:
+        results = asyncio.run(run(args.base_url, args.requests, args.concurrency))
+    else:
+        with StubServer(create_pricing_app(args.pricing_latency, args.pricing_failure_rate), 9101) as pricing, \
+                StubServer(create_sendgrid_app(), 9102) as sendgrid:
+            process, base_url = _start_app(args.port, args.workers, f"{pricing.url}/price", sendgrid.url)
+            try:
+                results = asyncio.run(run(base_url, args.requests, args.concurrency))
+            finally:
+                process.terminate()
+                process.wait()
+    write_results(args.output, "load", params, results)
+
+
+if __name__ == "__main__":
+    main()
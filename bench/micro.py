@@ -0,0 +1,113 @@
+"""
+Micro-benchmarks for hot functions on the request path. Needs the same environment
+variables as the app (Settings is loaded on import) but no database.
+
+    python -m bench.micro --output bench_results/micro.json
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+def measure(fn, number: int, repeat: int = 5) -> dict:
+    """
+    Run fn `number` times per round for `repeat` rounds; report per-call timings in microseconds.
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+    rounds.sort()
+    return {
+        "calls_per_round": number,
+        "rounds": repeat,
+        "best_us": rounds[0] * 1e6,
+        "median_us": rounds[len(rounds) // 2] * 1e6,
+        "ops_per_sec": 1 / rounds[len(rounds) // 2],
+    }
+
+
+def cart_submission_rows(count: int):
+    created = datetime(2024, 1, 1)
+    return [
+        {
+            "id": i,
+            "status": "pending",
+            "created_at": created + timedelta(minutes=i),
+            "user": {"email": f"user{i}@example.com", "name": f"User {i}", "phone_number": f"+91{i:010d}", "org_name": "Org"},
+            "cart_items": [
+                {"uuid": str(uuid.UUID(int=i * 10 + j)), "activity_name": f"Activity {j}", "quantity": j + 1}
+                for j in range(5)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def run(rows: int) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from app.core.auth_utils import create_access_token, verify_token, get_password_hash, verify_password
+    from app.core.pricing import pricing_cache_key
+    from app.core.compression import _Gzip, _Brotli, brotli
+    from app.core.config import settings
+    from app.schemas.cart import CartSubmissionPage
+    from pydantic import TypeAdapter
+    import orjson
+
+    results = {}
+    token = create_access_token({"sub": "bench-user", "role": "user"})
+    results["create_access_token"] = measure(lambda: create_access_token({"sub": "bench-user", "role": "user"}), 2000)
+    results["verify_token"] = measure(lambda: verify_token(token), 2000)
+
+    hashed = get_password_hash("bench-password")
+    results["bcrypt_hash"] = measure(lambda: get_password_hash("bench-password"), 3, repeat=3)
+    results["bcrypt_verify"] = measure(lambda: verify_password("bench-password", hashed), 3, repeat=3)
+
+    cart = cart_submission_rows(1)[0]["cart_items"]
+    results["pricing_cache_key"] = measure(lambda: pricing_cache_key(cart, 1.5, 1.2), 5000)
+
+    data = {"cart_submissions": cart_submission_rows(rows), "next_cursor": None}
+    results[f"serialize_{rows}_rows_jsonable_encoder_json"] = measure(
+        lambda: json.dumps(jsonable_encoder(data)).encode(), 3, repeat=3
+    )
+    # What GET /cart-submissions does now: response_model validation, pydantic-core
+    # serialization, then ORJSONResponse
+    page = TypeAdapter(CartSubmissionPage)
+    render = lambda: orjson.dumps(page.dump_python(page.validate_python(data), mode="json", exclude_unset=True))
+    results[f"serialize_{rows}_rows_response_model_orjson"] = measure(render, 3, repeat=3)
+
+    body = render()
+    results[f"wire_{rows}_rows_identity"] = {"bytes": len(body), "encode_ms": 0.0}
+    encoders = {"gzip": lambda: _Gzip(settings.gzip_compresslevel)}
+    if brotli is not None:
+        encoders["br"] = lambda: _Brotli(settings.brotli_quality)
+    for encoding, make in encoders.items():
+        start = time.perf_counter()
+        compressed = make().compress(body, True)
+        results[f"wire_{rows}_rows_{encoding}"] = {"bytes": len(compressed), "encode_ms": (time.perf_counter() - start) * 1000}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="Rows in the list serialization benchmarks")
+    parser.add_argument("--output", default="bench_results/micro.json")
+    args = parser.parse_args()
+
+    from bench.common import write_results
+
+    results = run(args.rows)
+    for name, result in results.items():
+        if "bytes" in result:
+            print(f"{name:50s} {result['bytes']:12d} bytes  encode {result['encode_ms']:.1f} ms")
+        else:
+            print(f"{name:50s} median {result['median_us']:12.1f} us  ({result['ops_per_sec']:.0f}/s)")
+    write_results(args.output, "micro", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Pricing cache scenario: quote carts through app.core.pricing.get_cart_price against
+bench.stubs' fake pricing webhook and check when the webhook is (and isn't) called.
+
+    python -m bench.pricing_cache
+
+Checks that a repeat quote is a cache hit, that reordering the cart's lines still hits,
+that changing either factor or the cart misses, and that pricing_cache.stats() and the
+webhook call count move accordingly. Needs the app's environment variables but no
+database (PRICING_CACHE_PERSIST is forced off); PRICING_WEBHOOK_URL is pointed at the
+stub. Exits non-zero when a check fails.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from bench.stubs import StubServer, create_pricing_app
+
+CART = [
+    {"uuid": "0b7b2f8e-0000-4000-8000-000000000001", "activity_name": "Robotics", "quantity": 2},
+    {"uuid": "0b7b2f8e-0000-4000-8000-000000000002", "activity_name": "Pottery", "quantity": 1},
+]
+
+
+async def run(stub_app) -> list:
+    from app.core.pricing import get_cart_price, pricing_cache
+    from app.core.pricing_client import pricing_client
+
+    pricing_cache.clear()
+    checks = []
+
+    async def quote(name, cart, direct_factor, indirect_factor, expect_hit):
+        calls, stats = stub_app.state.calls, pricing_cache.stats()
+        result = await get_cart_price(cart, direct_factor, indirect_factor)
+        after = pricing_cache.stats()
+        hit = after["hits"] == stats["hits"] + 1 and after["misses"] == stats["misses"]
+        called = stub_app.state.calls - calls
+        passed = hit == expect_hit and called == (0 if expect_hit else 1)
+        checks.append((name, passed, f"{'hit' if hit else 'miss'}, {called} webhook call(s), final={result['final']}"))
+
+    await pricing_client.start()
+    try:
+        await quote("first quote misses", CART, 1.5, 1.2, expect_hit=False)
+        await quote("repeat quote hits", CART, 1.5, 1.2, expect_hit=True)
+        await quote("reordered cart hits", list(reversed(CART)), 1.5, 1.2, expect_hit=True)
+        await quote("changed direct factor misses", CART, 1.6, 1.2, expect_hit=False)
+        await quote("changed indirect factor misses", CART, 1.5, 1.3, expect_hit=False)
+        changed = [dict(CART[0], quantity=3), CART[1]]
+        await quote("changed quantity misses", changed, 1.5, 1.2, expect_hit=False)
+        await quote("extra line misses", CART + [{"uuid": "0b7b2f8e-0000-4000-8000-000000000003",
+                                                  "activity_name": "Chess", "quantity": 1}], 1.5, 1.2, expect_hit=False)
+    finally:
+        await pricing_client.close()
+
+    stats = pricing_cache.stats()
+    checks.append(("stats() moved", stats["hits"] == 2 and stats["misses"] == 5 and stats["size"] == 5, str(stats)))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9121)
+    args = parser.parse_args()
+
+    stub_app = create_pricing_app()
+    with StubServer(stub_app, args.port) as stub:
+        os.environ.update(PRICING_WEBHOOK_URL=f"{stub.url}/price", PRICING_BACKEND="webhook", PRICING_CACHE_PERSIST="false")
+        checks = asyncio.run(run(stub_app))
+
+    for name, passed, detail in checks:
+        print(f"{'ok  ' if passed else 'FAIL'} {name:32s} {detail}")
+    sys.exit(0 if all(passed for _, passed, _ in checks) else 1)
+
+
+if __name__ == "__main__":
+    main()
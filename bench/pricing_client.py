@@ -0,0 +1,133 @@
+"""
+Pricing webhook client benchmark: the original blocking `requests.post` call against
+the pooled httpx client with retries and the circuit breaker, driven by the same number
+of concurrent callers on one event loop (as in a single uvicorn worker).
+
+    python -m bench.pricing_client --calls 200 --concurrency 50 --latency 0.2
+    python -m bench.pricing_client --output bench_results/pricing_client.json
+
+Scenarios run against bench.stubs' fake pricing webhook:
+    slow     every call succeeds after --latency seconds
+    flaky    half the calls fail with a 503
+    down     every call fails with a 503
+
+Besides throughput and latency this reports the worst event-loop stall seen by a ticker
+task (the old call blocks the loop for the whole request) and how many requests reached
+the webhook (the breaker stops sending them once the service is down). Needs the app's
+environment variables; PRICING_WEBHOOK_URL is pointed at the stub.
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+import requests
+from bench.common import summarize, write_results
+from bench.stubs import StubServer, create_pricing_app
+
+SCENARIOS = {"slow": 0.0, "flaky": 0.5, "down": 1.0}
+
+
+def _legacy_quote(url: str, cart_items, direct_factor: float, indirect_factor: float) -> dict:
+    # The call calculate_cart_price used to make: no timeout, no retries, on the event loop
+    response = requests.post(
+        f"{url}?direct_factor={direct_factor}&indirect_factor={indirect_factor}",
+        headers={"Content-Type": "application/json"},
+        json=cart_items,
+    )
+    if response.status_code != 200:
+        raise RuntimeError("Pricing service failed")
+    return response.json()
+
+
+async def _drive(quote, calls: int, concurrency: int) -> dict:
+    cart = [{"uuid": str(uuid.uuid4()), "activity_name": "bench", "quantity": 2}]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, outcomes = [], {}
+    worst_stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker(interval: float = 0.01):
+        nonlocal worst_stall
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            worst_stall = max(worst_stall, time.perf_counter() - start - interval)
+
+    async def call(i: int, arrived: float):
+        # Every call arrives when the burst starts, so time spent queued behind
+        # other calls (or behind a blocked event loop) counts towards its latency
+        async with semaphore:
+            try:
+                await quote(cart, 1.0, 1.0 + i / 1000)
+                outcome = "ok"
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - arrived)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(call(i, start) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+
+    summary = summarize(latencies, calls - outcomes.get("ok", 0), elapsed)
+    summary.update(outcomes=outcomes, worst_loop_stall_ms=worst_stall * 1000)
+    return summary
+
+
+async def _run_client(calls: int, concurrency: int) -> dict:
+    from app.core.pricing_client import PricingClient
+
+    # A fresh client per scenario, so the breaker starts closed
+    client = PricingClient()
+    await client.start()
+    try:
+        return await _drive(client.quote, calls, concurrency)
+    finally:
+        await client.close()
+
+
+def run(calls: int, concurrency: int, latency: float, port: int) -> dict:
+    results = {}
+    for scenario, failure_rate in SCENARIOS.items():
+        app = create_pricing_app(latency, failure_rate)
+        with StubServer(app, port) as stub:
+            url = f"{stub.url}/price"
+            os.environ["PRICING_WEBHOOK_URL"] = url
+            from app.core.config import get_settings
+            get_settings.cache_clear()
+
+            async def legacy(cart_items, direct_factor, indirect_factor):
+                return _legacy_quote(url, cart_items, direct_factor, indirect_factor)
+
+            for mode, driver in (("requests.post", lambda: _drive(legacy, calls, concurrency)),
+                                 ("httpx client", lambda: _run_client(calls, concurrency))):
+                before = app.state.calls
+                result = asyncio.run(driver())
+                result["webhook_calls"] = app.state.calls - before
+                results[f"{scenario} / {mode}"] = result
+        port += 1
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake pricing webhook latency in seconds")
+    parser.add_argument("--port", type=int, default=9111)
+    parser.add_argument("--output", default="bench_results/pricing_client.json")
+    args = parser.parse_args()
+
+    results = run(args.calls, args.concurrency, args.latency, args.port)
+    for name, result in results.items():
+        print(f"{name:24s} rps={result['throughput_rps']:7.1f} p50={result['p50_ms']:7.1f}ms p99={result['p99_ms']:8.1f}ms "
+              f"stall={result['worst_loop_stall_ms']:7.1f}ms webhook_calls={result['webhook_calls']:4d} {result['outcomes']}")
+    write_results(args.output, "pricing_client", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
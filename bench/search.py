@@ -0,0 +1,136 @@
+"""
+Role-request search benchmark: seed a Postgres database with --users synthetic users
+(one pending role request each), then time the /api/auth/role-requests/search query for
+a few representative terms and list the indexes each plan uses.
+
+    python -m bench.search --users 1000000 --output bench_results/search.json
+    python -m bench.search --cleanup          # delete the seeded rows afterwards
+
+Seeded users are named "sb-<n>" and are reused by later runs. Needs the app's database
+environment; run `python -m app.bootstrap` first so the trigram indexes exist. Exits
+non-zero when a selective term's p99 exceeds --max-p99-ms. Broad terms such as
+"@gmail.com" match a third of the table and have to be ranked in full, so they are
+reported but not gated.
+"""
+import argparse
+import sys
+import time
+from sqlalchemy import text
+from bench.common import summarize, write_results
+
+# term -> whether it is selective enough to be held to --max-p99-ms
+TERMS = {
+    "98765": True,            # digits anywhere in the phone number
+    "+91 90000 12": True,     # phone prefix, typed with separators
+    "sb123456@": True,        # email prefix
+    "@yahoo.com": False,      # email suffix, matches a third of the users
+    "Bench 4242": True,       # name substring
+}
+
+_SEED_USERS = text("""
+    INSERT INTO users (username, phone_number, email, name, role, hashed_password)
+    SELECT 'sb-' || g,
+           '+91 ' || (9000000000 + g)::text,
+           'sb' || g || '@' || (ARRAY['gmail.com', 'yahoo.com', 'example.org'])[1 + g % 3],
+           'Search Bench ' || g,
+           'user',
+           'x'
+    FROM generate_series(:start, :stop) AS g
+""")
+
+_SEED_REQUESTS = text("""
+    INSERT INTO role_upgrade_requests (user_id, requested_role, status)
+    SELECT id, 'organisation', 'pending' FROM users
+    WHERE username LIKE 'sb-%' AND NOT EXISTS (
+        SELECT 1 FROM role_upgrade_requests r WHERE r.user_id = users.id
+    )
+""")
+
+
+def seed(users: int, batch_size: int):
+    from app.core.db import get_engine
+
+    engine = get_engine()
+    with engine.connect() as conn:
+        existing = conn.execute(text("SELECT count(*) FROM users WHERE username LIKE 'sb-%'")).scalar()
+    for start in range(existing + 1, users + 1, batch_size):
+        stop = min(start + batch_size - 1, users)
+        with engine.begin() as conn:
+            conn.execute(_SEED_USERS, {"start": start, "stop": stop})
+        print(f"seeded users up to {stop}")
+    with engine.begin() as conn:
+        conn.execute(_SEED_REQUESTS)
+        conn.execute(text("ANALYZE users"))
+        conn.execute(text("ANALYZE role_upgrade_requests"))
+
+
+def cleanup():
+    from app.core.db import get_engine
+
+    with get_engine().begin() as conn:
+        conn.execute(text(
+            "DELETE FROM role_upgrade_requests WHERE user_id IN (SELECT id FROM users WHERE username LIKE 'sb-%')"
+        ))
+        deleted = conn.execute(text("DELETE FROM users WHERE username LIKE 'sb-%'")).rowcount
+    print(f"deleted {deleted} seeded users")
+
+
+def _indexes_used(db, query):
+    compiled = query.statement.compile(dialect=db.get_bind().dialect)
+    plan = db.connection().exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).scalars().all()
+    return sorted({word for line in plan for word in line.split() if word.startswith("ix_")})
+
+
+def run(terms: dict, limit: int, iterations: int) -> dict:
+    from app.api.auth import role_request_search_query
+    from app.core.db import ReadSessionLocal
+
+    results = {}
+    db = ReadSessionLocal()
+    try:
+        for term, selective in terms.items():
+            role_request_search_query(db, term, limit).all()  # warm up
+            latencies, matches = [], 0
+            start = time.perf_counter()
+            for _ in range(iterations):
+                call_start = time.perf_counter()
+                matches = len(role_request_search_query(db, term, limit).all())
+                latencies.append(time.perf_counter() - call_start)
+                db.expunge_all()
+            summary = summarize(latencies, 0, time.perf_counter() - start)
+            summary.update(matches=matches, selective=selective, indexes=_indexes_used(db, role_request_search_query(db, term, limit)))
+            results[f"search {term!r}"] = summary
+    finally:
+        db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20, help="Page size, as in the endpoint's ?limit=")
+    parser.add_argument("--max-p99-ms", type=float, default=10.0)
+    parser.add_argument("--cleanup", action="store_true", help="Delete the seeded users and exit")
+    parser.add_argument("--output", default="bench_results/search.json")
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    seed(args.users, args.batch_size)
+    results = run(TERMS, args.limit, args.iterations)
+    for name, result in results.items():
+        print(f"{name:24s} matches={result['matches']:3d} p50={result['p50_ms']:.2f}ms "
+              f"p99={result['p99_ms']:.2f}ms indexes={','.join(result['indexes']) or '-'}")
+    write_results(args.output, "search", vars(args), results)
+
+    slow = [name for name, result in results.items() if result["selective"] and result["p99_ms"] > args.max_p99_ms]
+    print(f"over {args.max_p99_ms}ms: {', '.join(slow)}" if slow else "selective searches within budget")
+    sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Load-shedding scenario: saturate GET /api/cart/calculate-price/{id} against a slow fake
+pricing webhook while probing GET /api/auth/get-role, and check that the cheap route
+stays healthy while the expensive one is shed with 503s.
+
+    python -m bench.shedding --pricing-latency 3 --expensive 200 --output bench_results/shedding.json
+    python -m bench.shedding --no-shedding     # same run with LOAD_SHED_ENABLED=false, for comparison
+
+Needs the same database environment as bench.load: the app runs under uvicorn in a
+subprocess against the configured Postgres database, which is recorded in the result
+file. Numbers from any other setup (e.g. an in-process app on SQLite) aren't comparable.
+Exits non-zero when the cheap route saw errors or its p99 exceeded --max-cheap-p99-ms.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+import httpx
+from sqlalchemy.engine import make_url
+from app.core.config import settings
+from bench.common import summarize, write_results
+from bench.load import _promote_to_superuser, _start_app
+from bench.stubs import StubServer, create_pricing_app, create_sendgrid_app
+
+
+async def _admin_headers(client) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    admin = {"username": f"shed-{run_id}", "password": "bench-password", "email": f"shed-{run_id}@example.com",
+             "phone_number": f"+3{uuid.uuid4().int % 10 ** 9:09d}", "name": "Shedding Bench"}
+    (await client.post("/api/auth/register", json=admin)).raise_for_status()
+    _promote_to_superuser(admin["username"])
+    login = (await client.post("/api/auth/login", json={"email": admin["email"], "password": admin["password"]})).json()
+    return {"Authorization": f"Bearer {login['access_token']}"}
+
+
+async def run(base_url: str, expensive: int, probe_interval: float) -> dict:
+    limits = httpx.Limits(max_connections=expensive + 16)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        headers = await _admin_headers(client)
+        cart = [{"uuid": str(uuid.uuid4()), "activity_name": "shedding", "quantity": 1}]
+        (await client.post("/api/cart/submit-cart", json=cart, headers=headers)).raise_for_status()
+        page = (await client.get("/api/cart/cart-submissions", params={"limit": 1}, headers=headers)).json()
+        submission_id = page["cart_submissions"][0]["id"]
+
+        expensive_statuses, expensive_latencies = [], []
+        cheap_statuses, cheap_latencies = [], []
+
+        async def expensive_call(i: int):
+            start = time.perf_counter()
+            try:
+                # Distinct factors so every call misses the pricing cache
+                response = await client.get(f"/api/cart/calculate-price/{submission_id}",
+                                            params={"direct_factor": 1.0, "indirect_factor": 1.0 + i / 1000}, headers=headers)
+                expensive_statuses.append(response.status_code)
+            except httpx.HTTPError:
+                expensive_statuses.append(0)
+            expensive_latencies.append(time.perf_counter() - start)
+
+        async def probe(stop: asyncio.Event):
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    response = await client.get("/api/auth/get-role", headers=headers)
+                    cheap_statuses.append(response.status_code)
+                except httpx.HTTPError:
+                    cheap_statuses.append(0)
+                cheap_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(probe_interval)
+
+        stop = asyncio.Event()
+        probes = [asyncio.create_task(probe(stop)) for _ in range(4)]
+        start = time.perf_counter()
+        await asyncio.gather(*(expensive_call(i) for i in range(expensive)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*probes)
+
+    expensive_summary = summarize(expensive_latencies, sum(1 for s in expensive_statuses if s != 200), elapsed)
+    expensive_summary["shed_503"] = sum(1 for s in expensive_statuses if s == 503)
+    cheap_summary = summarize(cheap_latencies, sum(1 for s in cheap_statuses if s != 200), elapsed)
+    return {
+        "GET /api/cart/calculate-price/{id} (saturated)": expensive_summary,
+        "GET /api/auth/get-role (during saturation)": cheap_summary,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--expensive", type=int, default=200, help="Concurrent calculate-price requests")
+    parser.add_argument("--pricing-latency", type=float, default=3.0, help="Fake pricing webhook latency in seconds")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--max-cheap-p99-ms", type=float, default=500.0)
+    parser.add_argument("--no-shedding", action="store_true", help="Run the app with LOAD_SHED_ENABLED=false")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--output", default="bench_results/shedding.json")
+    args = parser.parse_args()
+
+    extra_env = {"LOAD_SHED_ENABLED": "false"} if args.no_shedding else {}
+    with StubServer(create_pricing_app(args.pricing_latency), 9103) as pricing, StubServer(create_sendgrid_app(), 9104) as sendgrid:
+        process, base_url = _start_app(args.port, 1, f"{pricing.url}/price", sendgrid.url, extra_env)
+        try:
+            results = asyncio.run(run(base_url, args.expensive, args.probe_interval))
+        finally:
+            process.terminate()
+            process.wait()
+
+    for name, result in results.items():
+        print(f"{name:50s} requests={result['requests']:5d} errors={result['errors']:5d} "
+              f"p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms")
+    params = dict(vars(args), database=make_url(settings.database_url).render_as_string(hide_password=True))
+    write_results(args.output, "shedding", params, results)
+
+    cheap = results["GET /api/auth/get-role (during saturation)"]
+    healthy = cheap["errors"] == 0 and cheap["p99_ms"] <= args.max_cheap_p99_ms
+    print("cheap route healthy" if healthy else "cheap route DEGRADED")
+    sys.exit(0 if healthy else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Cold-start benchmark. Each run is a fresh interpreter that times, in order:
+
+    settings       reading Settings from the environment
+    import         importing app.main (routers, models, middleware)
+    engine         creating the primary engine and opening its first connection
+    first_request  running the lifespan startup and serving GET /
+
+    python -m bench.startup --runs 10 --output bench_results/startup.json
+
+Needs the app's environment variables and a reachable database for the engine phase.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from bench.common import summarize, write_results
+
+PHASES = ("settings", "import", "engine", "first_request")
+
+_PROBE = """
+import json, time
+timings = {}
+
+start = time.perf_counter()
+from app.core.config import get_settings
+get_settings()
+timings["settings"] = time.perf_counter() - start
+
+start = time.perf_counter()
+import app.main
+timings["import"] = time.perf_counter() - start
+
+start = time.perf_counter()
+from app.core.db import get_engine
+get_engine().connect().close()
+timings["engine"] = time.perf_counter() - start
+
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    client.get("/").raise_for_status()
+    timings["first_request"] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+def probe(env: dict) -> dict:
+    output = subprocess.check_output([sys.executable, "-c", _PROBE], env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", default="bench_results/startup.json")
+    args = parser.parse_args()
+
+    # Keep the outbox worker from racing the measured first request
+    env = dict(os.environ, EMAIL_OUTBOX_WORKER_ENABLED="false", PYTHONDONTWRITEBYTECODE="1")
+    samples = {phase: [] for phase in PHASES}
+    totals = []
+    for _ in range(args.runs):
+        timings = probe(env)
+        for phase in PHASES:
+            samples[phase].append(timings[phase])
+        totals.append(sum(timings.values()))
+
+    results = {f"startup {phase}": summarize(values) for phase, values in samples.items()}
+    results["startup total"] = summarize(totals)
+    for name, result in results.items():
+        print(f"{name:25s} p50={result['p50_ms']:8.1f}ms  p95={result['p95_ms']:8.1f}ms  max={result['max_ms']:8.1f}ms")
+    write_results(args.output, "startup", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Local stand-ins for the external services the backend talks to, so benchmarks
+never hit the real pricing webhook or SendGrid.
+
+    python -m bench.stubs --pricing-port 9001 --sendgrid-port 9002 --pricing-latency 0.05
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+
+def create_pricing_app(latency: float = 0.0, failure_rate: float = 0.0) -> FastAPI:
+    """
+    Fake pricing webhook: echoes one component per line item after `latency` seconds,
+    failing with a 503 for `failure_rate` of the calls.
+    """
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.post("/price")
+    async def price(request: Request, direct_factor: float = 1.0, indirect_factor: float = 1.0):
+        app.state.calls += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if failure_rate and random.random() < failure_rate:
+            return Response(status_code=503)
+        items = await request.json()
+        components = [
+            {"uuid": item["uuid"], "quantity": item["quantity"], "total": item["quantity"] * (direct_factor + indirect_factor)}
+            for item in items
+        ]
+        return {"final": sum(c["total"] for c in components), "components": components}
+
+    return app
+
+
+def create_sendgrid_app(latency: float = 0.0) -> FastAPI:
+    """
+    Fake SendGrid v3 API: accepts /v3/mail/send and records the messages.
+    """
+    app = FastAPI()
+    app.state.messages = []
+
+    @app.post("/v3/mail/send", status_code=202)
+    async def send(request: Request):
+        if latency:
+            await asyncio.sleep(latency)
+        app.state.messages.append(await request.json())
+        return Response(status_code=202)
+
+    return app
+
+
+class StubServer:
+    """
+    Runs an ASGI app with uvicorn on a background thread.
+    """
+
+    def __init__(self, app, port: int, host: str = "127.0.0.1"):
+        self.app = app
+        self.url = f"http://{host}:{port}"
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pricing-port", type=int, default=9001)
+    parser.add_argument("--sendgrid-port", type=int, default=9002)
+    parser.add_argument("--pricing-latency", type=float, default=0.0)
+    parser.add_argument("--pricing-failure-rate", type=float, default=0.0)
+    parser.add_argument("--sendgrid-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with StubServer(create_pricing_app(args.pricing_latency, args.pricing_failure_rate), args.pricing_port) as pricing, \
+            StubServer(create_sendgrid_app(args.sendgrid_latency), args.sendgrid_port) as sendgrid:
+        print(f"pricing webhook: {pricing.url}/price")
+        print(f"sendgrid api:    {sendgrid.url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Sync vs async session comparison: the same read (one page of recent cart submissions,
+optionally preceded by pg_sleep to stand in for a slow query) served by a blocking
+`def` route on SessionLocal and by its `async def` twin on AsyncSessionLocal, driven at
+the same concurrency.
+
+    python -m bench.sync_async --requests 2000 --concurrency 64 --query-delay 0.01
+    python -m bench.sync_async --output bench_results/sync_async.json
+
+The blocking route runs in Starlette's threadpool (40 threads), the async one on the
+event loop; the two engines split DB_POOL_SIZE and DB_MAX_OVERFLOW by DB_ASYNC_POOL_SHARE,
+so set it to 0.5 (the default) for an even comparison.
+Needs the app's database environment, like bench.load. DB_URL=sqlite:///... also works
+with --query-delay 0 (pg_sleep is Postgres-only), but aiosqlite has no connection pool
+and runs each connection on its own thread, so SQLite numbers say little about Postgres.
+"""
+import argparse
+import asyncio
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select, func
+from bench.common import summarize, write_results
+from bench.load import _drive
+from bench.stubs import StubServer
+
+
+def create_app(query_delay: float) -> FastAPI:
+    from app.core.db import SessionLocal, AsyncSessionLocal
+    from app.models import cart, user  # noqa: F401  (CartSubmission's relationships need User mapped)
+    from app.models.cart import CartSubmission
+
+    page = (
+        select(CartSubmission.id, CartSubmission.status, CartSubmission.created_at)
+        .order_by(CartSubmission.id.desc())
+        .limit(20)
+    )
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_page():
+        db = SessionLocal()
+        try:
+            if query_delay:
+                db.execute(select(func.pg_sleep(query_delay)))
+            return [row.id for row in db.execute(page)]
+        finally:
+            db.close()
+
+    @app.get("/async")
+    async def async_page():
+        async with AsyncSessionLocal() as db:
+            if query_delay:
+                await db.execute(select(func.pg_sleep(query_delay)))
+            return [row.id for row in await db.execute(page)]
+
+    return app
+
+
+async def run(base_url: str, total: int, concurrency: int) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        for route in ("/sync", "/async"):
+            await _drive(client, concurrency, [("GET", route, {})] * min(total, concurrency))  # warm up the pools
+            latencies, errors, elapsed, _ = await _drive(client, concurrency, [("GET", route, {})] * total)
+            results[f"GET {route}"] = summarize(latencies, errors, elapsed)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--query-delay", type=float, default=0.01, help="pg_sleep seconds before each page query; 0 disables")
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--output", default="bench_results/sync_async.json")
+    args = parser.parse_args()
+
+    with StubServer(create_app(args.query_delay), args.port) as server:
+        results = asyncio.run(run(server.url, args.requests, args.concurrency))
+
+    for name, result in results.items():
+        print(f"{name:12s} rps={result['throughput_rps']:8.1f} p50={result['p50_ms']:7.1f}ms "
+              f"p99={result['p99_ms']:8.1f}ms errors={result['errors']}")
+    write_results(args.output, "sync_async", vars(args), results)
+
+
+if __name__ == "__main__":
+    main()
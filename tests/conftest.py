@@ -0,0 +1,88 @@
+import json
+import os
+import pytest
+
+# Settings() refuses to load without these; the tests never reach Postgres, Twilio or
+# SendGrid, so placeholders are enough. Tests that need a database point DB_URL at SQLite.
+for name, value in {
+    "PG_HOST": "localhost", "PG_PORT": "5432", "PG_USER": "test", "PG_PASSWORD": "test", "PG_DB": "test",
+    "DB_PORT": "5432", "SECRET_KEY": "test-secret", "JWT_SECRET_KEY": "test-jwt-secret",
+    "TWILLIO_SENDGRID_API_KEY": "test", "REGISTERED_FROM_MAIL": "noreply@example.com",
+    "TWILIO_ACCOUNT_SID": "test", "TWILIO_AUTH_TOKEN": "test", "TWILIO_WHATSAPP_SENDER": "test",
+    "TWILIO_SMS_SENDER": "test", "PRICING_WEBHOOK_URL": "http://127.0.0.1:9/price",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    """
+    Overrides settings through the environment for one test: configure(load_shed_reserved=2).
+    Non-string values are passed as JSON, the way pydantic-settings reads complex fields.
+    """
+    from app.core.config import get_settings
+
+    def apply(**values):
+        for name, value in values.items():
+            monkeypatch.setenv(name.upper(), value if isinstance(value, str) else json.dumps(value))
+        get_settings.cache_clear()
+
+    yield apply
+    get_settings.cache_clear()
+
+
+@pytest.fixture
+def database(configure, tmp_path):
+    """
+    A fresh SQLite database with the app's schema; engines are rebuilt against it.
+    """
+    from app.core import db, sessions
+    from app.core.dependencies import principal_cache
+    from app.bootstrap import create_schema
+
+    def reset():
+        for engine in db._engines.values():
+            getattr(engine, "sync_engine", engine).dispose()
+        db._engines.clear()
+        # Per-worker mirrors of the database, which restarts its ids for every test
+        principal_cache.clear()
+        sessions._revoked.clear()
+
+    reset()
+    configure(db_url=f"sqlite:///{tmp_path / 'test.db'}")
+    create_schema()
+    yield db
+    reset()
+
+
+@pytest.fixture
+def client(database):
+    """
+    TestClient on the app without its lifespan, so no background workers run.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_user(database):
+    """
+    Insert a user directly (no password hashing) and return (user id, bearer headers).
+    """
+    from app.core.auth_utils import create_access_token
+    from app.models.user import User
+
+    def make(username: str, role: str = "user"):
+        session = database.SessionLocal()
+        try:
+            user = User(username=username, email=f"{username}@example.com", phone_number=username, role=role, hashed_password="x")
+            session.add(user)
+            session.commit()
+            user_id = user.id
+        finally:
+            session.close()
+        return user_id, {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+    return make
@@ -0,0 +1,57 @@
+import json
+import pytest
+from app.models.cart import CartSubmission, StatusEnum
+
+ITEMS = [{"uuid": "7e1d0b7e-1111-4a4a-9b9b-123456789012", "activity_name": "Robotics", "quantity": 2}]
+
+
+@pytest.fixture
+def admin(client, make_user, monkeypatch):
+    from app.core.pricing import pricing_cache
+    from app.core.pricing_client import pricing_client
+
+    async def quote(cart_items, direct_factor, indirect_factor):
+        return {"final": 10.0, "components": []}
+
+    monkeypatch.setattr(pricing_client, "quote", quote)
+    pricing_cache.clear()
+    return make_user("admin", role="superuser")[1]
+
+
+def _carts(database, *statuses):
+    session = database.SessionLocal()
+    try:
+        # Owned by the admin, the only user in the database
+        carts = [CartSubmission(user_id=1, status=status, cart_items=ITEMS) for status in statuses]
+        session.add_all(carts)
+        session.commit()
+        return [cart.id for cart in carts]
+    finally:
+        session.close()
+
+
+def _bulk(client, headers, **body):
+    response = client.post("/api/cart/calculate-price/bulk", headers=headers, json=dict(body, direct_factor=1, indirect_factor=2))
+    lines = [json.loads(line) for line in response.text.splitlines()] if response.status_code == 200 else []
+    return response, {line["cart_submission_id"]: line.get("error") for line in lines}
+
+
+def test_ids_filtered_out_by_status_are_not_reported_missing(client, database, admin):
+    pending, replied = _carts(database, StatusEnum.pending, StatusEnum.replied)
+
+    response, results = _bulk(client, admin, cart_submission_ids=[pending, replied, 999], status="pending")
+    assert response.status_code == 200
+    assert results == {pending: None, replied: "Cart submission is not pending", 999: "Cart submission not found"}
+
+
+def test_status_selection_over_the_cap_is_rejected(client, database, admin, configure):
+    configure(pricing_bulk_max_carts=2)
+    _carts(database, StatusEnum.pending, StatusEnum.pending, StatusEnum.replied)
+
+    response, results = _bulk(client, admin, status="replied")
+    assert response.status_code == 200 and len(results) == 1
+
+    _carts(database, StatusEnum.pending)
+    response, _ = _bulk(client, admin, status="pending")
+    assert response.status_code == 400
+    assert "More than 2 carts" in response.json()["detail"]
@@ -0,0 +1,18 @@
+import pytest
+from app.core import hash_pool
+
+
+@pytest.mark.parametrize("cpus, web_concurrency, workers", [(8, 1, 8), (8, 4, 2), (8, 16, 1), (None, 4, 1)])
+def test_default_pool_is_the_worker_share_of_the_cores(configure, monkeypatch, cpus, web_concurrency, workers):
+    monkeypatch.setattr(hash_pool.os, "cpu_count", lambda: cpus)
+    configure(web_concurrency=web_concurrency)
+    assert hash_pool._workers() == workers
+    # The admission semaphore follows the pool size
+    assert hash_pool._concurrency() == workers
+
+
+def test_explicit_sizes_win(configure, monkeypatch):
+    monkeypatch.setattr(hash_pool.os, "cpu_count", lambda: 8)
+    configure(web_concurrency=4, hash_pool_workers=3, hash_pool_concurrency=5)
+    assert hash_pool._workers() == 3
+    assert hash_pool._concurrency() == 5
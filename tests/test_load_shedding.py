@@ -0,0 +1,91 @@
+import asyncio
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app.core.load_shedding import LoadSheddingMiddleware
+
+
+def _app(release: asyncio.Event, started: dict):
+    async def hold(request):
+        path = request.url.path
+        started[path] = started.get(path, 0) + 1
+        await release.wait()
+        return PlainTextResponse("ok")
+
+    routes = [Route(path, hold) for path in ("/slow", "/other", "/auth")]
+    return LoadSheddingMiddleware(Starlette(routes=routes))
+
+
+async def _until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out waiting for requests to be admitted"
+        await asyncio.sleep(0.01)
+
+
+def test_saturated_pool_is_shed_while_reserved_budget_admits_priority_pool(configure):
+    # 5 slots in total, the last 2 reserved for priority pools: non-priority pools share 3
+    configure(
+        load_shed_max_in_flight=5,
+        load_shed_reserved=2,
+        load_shed_retry_after=7,
+        load_shed_pools={
+            "slow": {"prefixes": ["/slow"], "max_in_flight": 2, "max_queue": 0, "queue_timeout": 1.0},
+            "other": {"prefixes": ["/other"], "max_in_flight": 10, "max_queue": 0, "queue_timeout": 1.0},
+            "auth": {"prefixes": ["/auth"], "max_in_flight": 10, "max_queue": 0, "queue_timeout": 1.0, "priority": True},
+        },
+    )
+
+    async def scenario():
+        release, started = asyncio.Event(), {}
+        app = _app(release, started)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            held = [asyncio.create_task(client.get("/slow")) for _ in range(2)]
+            await _until(lambda: started.get("/slow") == 2)
+
+            # The pool is full and queues nothing, so the next request is shed
+            shed = await client.get("/slow")
+            assert shed.status_code == 503
+            assert shed.headers["Retry-After"] == "7"
+
+            # Another pool still gets the last non-reserved slot...
+            held.append(asyncio.create_task(client.get("/other")))
+            await _until(lambda: started.get("/other") == 1)
+            assert app.in_flight == 3
+
+            # ...after which non-priority pools are held out of the reserve...
+            reserved = await client.get("/other")
+            assert reserved.status_code == 503
+            assert reserved.headers["Retry-After"] == "7"
+
+            # ...but the priority pool is admitted into it
+            held.append(asyncio.create_task(client.get("/auth")))
+            await _until(lambda: started.get("/auth") == 1)
+            assert app.in_flight == 4
+
+            release.set()
+            assert [response.status_code for response in await asyncio.gather(*held)] == [200] * 4
+            assert app.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_exempt_prefixes_bypass_shedding(configure):
+    configure(
+        load_shed_max_in_flight=1,
+        load_shed_reserved=1,
+        load_shed_exempt_prefixes=["/slow"],
+        load_shed_pools={"default": {"prefixes": [], "max_in_flight": 1, "max_queue": 0, "queue_timeout": 1.0}},
+    )
+
+    async def scenario():
+        release, started = asyncio.Event(), {}
+        app = _app(release, started)
+        release.set()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            # Every non-priority slot is reserved, so only the exempt path gets through
+            assert (await client.get("/slow")).status_code == 200
+            assert (await client.get("/other")).status_code == 503
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+import asyncio
+from app.core.periodic import run_periodic_sync
+
+
+def _run(seconds: float, **kwargs):
+    calls = {"sync": 0, "cleanup": 0}
+
+    async def sync(db):
+        calls["sync"] += 1
+        if calls["sync"] == 1:
+            raise RuntimeError("first pass fails")
+
+    async def cleanup(db):
+        calls["cleanup"] += 1
+
+    async def scenario():
+        stop = asyncio.Event()
+        task = asyncio.create_task(run_periodic_sync(stop, "testing", sync, lambda: 0.01, cleanup=cleanup, **kwargs))
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.wait_for(task, timeout=1)
+
+    asyncio.run(scenario())
+    return calls
+
+
+def test_cleanup_runs_on_its_own_interval_and_errors_do_not_stop_the_loop(configure):
+    configure(db_url="sqlite:///:memory:")
+    calls = _run(0.3, cleanup_interval=lambda: 0.1)
+    assert calls["sync"] > 5
+    assert 1 <= calls["cleanup"] < calls["sync"]
+
+
+def test_zero_cleanup_interval_disables_cleanup(configure):
+    configure(db_url="sqlite:///:memory:")
+    calls = _run(0.1, cleanup_interval=lambda: 0)
+    assert calls["sync"] > 1 and calls["cleanup"] == 0
@@ -0,0 +1,22 @@
+from app.models.user import RoleUpgradeRequestTable
+
+
+def test_counts_follow_a_decision_in_the_same_worker(client, database, make_user):
+    from app.api.auth import role_request_counts_cache
+
+    role_request_counts_cache.clear()
+    _, admin = make_user("admin", role="superuser")
+    user_id, _ = make_user("bob")
+    session = database.SessionLocal()
+    try:
+        request = RoleUpgradeRequestTable(user_id=user_id, requested_role="organisation", status="pending")
+        session.add(request)
+        session.commit()
+        request_id = request.id
+    finally:
+        session.close()
+
+    assert client.get("/api/auth/role-requests/counts", headers=admin).json() == {"pending": 1, "approved": 0, "rejected": 0}
+    decided = client.put("/api/auth/role-requests/bulk", headers=admin, json={"request_ids": [request_id], "approve": True})
+    assert decided.status_code == 200
+    assert client.get("/api/auth/role-requests/counts", headers=admin).json() == {"pending": 0, "approved": 1, "rejected": 0}
@@ -0,0 +1,53 @@
+import asyncio
+import httpx
+from app.core.auth_utils import create_refresh_token
+from app.core.sessions import open_session
+
+
+def _login(database, make_user):
+    user_id, _ = make_user("alice")
+
+    async def open_():
+        async with database.AsyncSessionLocal() as db:
+            session, jti = await open_session(db, user_id)
+            await db.commit()
+            return session.id, jti
+
+    session_id, jti = asyncio.run(open_())
+    return create_refresh_token({"sub": "alice", "sid": session_id, "jti": jti})
+
+
+def _refresh_concurrently(client, *tokens):
+    async def refresh():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await asyncio.gather(*(http.post("/api/auth/refresh", json={"refresh_token": token}) for token in tokens))
+
+    return asyncio.run(refresh())
+
+
+def test_concurrent_double_refresh_keeps_the_session(client, database, make_user):
+    token = _login(database, make_user)
+
+    first, second = _refresh_concurrently(client, token, token)
+    assert (first.status_code, second.status_code) == (200, 200)
+    # The retry gets the pair the winning refresh issued, not another rotation
+    assert first.json()["refresh_token"] == second.json()["refresh_token"]
+
+    current = first.json()["refresh_token"]
+    third = client.post("/api/auth/refresh", json={"refresh_token": current})
+    assert third.status_code == 200
+
+    # Two rotations back is reuse, and ends the session
+    assert client.post("/api/auth/refresh", json={"refresh_token": token}).status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": third.json()["refresh_token"]}).status_code == 401
+
+
+def test_reuse_after_the_grace_window_revokes_the_session(client, database, make_user, configure):
+    configure(session_refresh_grace=0)
+    token = _login(database, make_user)
+
+    current = client.post("/api/auth/refresh", json={"refresh_token": token})
+    assert current.status_code == 200
+    assert client.post("/api/auth/refresh", json={"refresh_token": token}).status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": current.json()["refresh_token"]}).status_code == 401
@@ -0,0 +1,58 @@
+from datetime import datetime
+from fastapi import Request, Response
+from app.core import versions
+from app.core.versions import ROLE_REQUESTS, conditional_response
+
+
+def _request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": raw})
+
+
+def _at(monkeypatch, now: datetime):
+    class _Clock(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now
+
+    monkeypatch.setattr(versions, "datetime", _Clock)
+
+
+def _get(row, **headers):
+    response = Response()
+    return conditional_response(_request(**headers), response, ROLE_REQUESTS, row), response
+
+
+def test_write_in_the_same_second_is_not_hidden_by_if_modified_since(monkeypatch):
+    # The client's copy is served at 12:00:00.500, after a write at .200 ...
+    _at(monkeypatch, datetime(2026, 1, 1, 12, 0, 0, 500000))
+    _, first = _get((1, datetime(2026, 1, 1, 12, 0, 0, 200000)))
+    assert first.headers["Last-Modified"] == "Thu, 01 Jan 2026 12:00:00 GMT"
+
+    # ... and another write lands at .800, within the same second
+    _at(monkeypatch, datetime(2026, 1, 1, 12, 0, 5))
+    not_modified, second = _get((2, datetime(2026, 1, 1, 12, 0, 0, 800000)), if_modified_since=first.headers["Last-Modified"])
+    assert not_modified is None
+
+    # Once the second is over the client gets a date that does validate
+    assert second.headers["Last-Modified"] == "Thu, 01 Jan 2026 12:00:01 GMT"
+    not_modified, _ = _get((2, datetime(2026, 1, 1, 12, 0, 0, 800000)), if_modified_since=second.headers["Last-Modified"])
+    assert not_modified is not None and not_modified.status_code == 304
+
+
+def test_later_write_after_validating_date_is_served(monkeypatch):
+    _at(monkeypatch, datetime(2026, 1, 1, 12, 0, 5))
+    not_modified, _ = _get((3, datetime(2026, 1, 1, 12, 0, 1)), if_modified_since="Thu, 01 Jan 2026 12:00:01 GMT")
+    assert not_modified is None
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(monkeypatch):
+    _at(monkeypatch, datetime(2026, 1, 1, 12, 0, 5))
+    row = (1, datetime(2026, 1, 1, 12, 0, 0, 200000))
+    _, response = _get(row)
+
+    # A stale ETag wins over a date that would validate
+    not_modified, _ = _get(row, if_none_match='W/"stale"', if_modified_since="Thu, 01 Jan 2026 12:00:01 GMT")
+    assert not_modified is None
+    not_modified, _ = _get(row, if_none_match=response.headers["ETag"])
+    assert not_modified.status_code == 304